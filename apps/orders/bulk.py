@@ -0,0 +1,88 @@
+"""
+Пакетное создание заказов.
+
+Элементы валидируются по одному, но категории для всего пакета загружаются
+одним запросом, а регионы берутся из справочника в памяти. Корректные заказы
+и их фото вставляются через bulk_create, ошибочные возвращаются с индексом
+и не мешают остальным.
+"""
+from django.db import transaction
+
+from apps.orders import search
+from apps.orders.cache import invalidate_executor_feed
+from apps.orders.geo import geo_cell
+from apps.orders.models import Category, OrderImage, Orders
+from apps.orders.serializers import BulkOrderItemSerializer
+from apps.users.cache import get_regions_snapshot
+
+# Больше заказов за один запрос не принимаем
+MAX_BULK_ORDERS = 500
+
+
+def _related_ids(items, field):
+    ids = set()
+    for item in items:
+        value = item.get(field) if isinstance(item, dict) else None
+        if isinstance(value, (int, str)) and str(value).isdigit():
+            ids.add(int(value))
+    return ids
+
+
+def create_orders(items, user, context):
+    """
+    :param items: список словарей с полями заказа; фото — в ключе images как [{'image': файл}]
+    :param user: заказчик
+    :param context: контекст сериализатора (нужен request)
+    :return: (created, errors) — [(индекс, заказ)] и [(индекс, ошибки)]
+    """
+    context = {
+        **context,
+        'prefetched': {
+            'region': get_regions_snapshot().regions,
+            'type_orders': Category.objects.in_bulk(_related_ids(items, 'type_orders')),
+        },
+    }
+
+    valid, errors = [], []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            errors.append((index, {'non_field_errors': ["Ожидался объект заказа."]}))
+            continue
+        serializer = BulkOrderItemSerializer(data=item, context=context)
+        if serializer.is_valid():
+            valid.append((index, serializer.validated_data))
+        else:
+            errors.append((index, serializer.errors))
+
+    if not valid:
+        return [], errors
+
+    orders, images = [], []
+    for _, data in valid:
+        data = dict(data)
+        images_data = data.pop('images', [])
+        order = Orders(created_by=user, **data)
+        # bulk_create не вызывает Orders.save — ячейку геосетки считаем здесь
+        order.geo_cell = geo_cell(order.latitude, order.longitude)
+        orders.append(order)
+        images.append(images_data)
+
+    with transaction.atomic():
+        Orders.objects.bulk_create(orders)
+        order_images = OrderImage.objects.bulk_create([
+            OrderImage(order=order, image=image_data['image'])
+            for order, images_data in zip(orders, images)
+            for image_data in images_data
+        ])
+
+        # Сигналы и OrderImage.save при bulk_create не срабатывают — делаем их работу пакетом
+        search.index_orders([order.pk for order in orders])
+        for region_id in {order.region_id for order in orders} - {None}:
+            transaction.on_commit(lambda region_id=region_id: invalidate_executor_feed(region_id))
+
+        from apps.orders.tasks import convert_order_image_task
+        for order_image in order_images:
+            if not order_image.image.name.endswith('.webp'):
+                transaction.on_commit(lambda pk=order_image.pk: convert_order_image_task.delay(pk))
+
+    return [(index, order) for (index, _), order in zip(valid, orders)], errors
@@ -0,0 +1,116 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.renderers import JSONRenderer
+
+from apps.orders.models import Category
+
+CATEGORY_TREE_KEY = 'orders:category_tree'
+
+EXECUTOR_FEED_PREFIX = 'orders:executor_feed'
+FEED_STATS = ('hits', 'misses')
+# Сколько ждать чужой пересборки страницы, прежде чем собрать её самим
+FEED_LOCK_TIMEOUT = 5
+FEED_WAIT_STEP = 0.05
+
+
+def build_category_tree():
+    """
+    Строит дерево активных категорий одним запросом и возвращает
+    (etag, json_bytes). Неактивные категории скрываются вместе с поддеревом.
+    """
+    from apps.orders.serializers import CategorySerializer
+
+    roots = Category.objects.all().get_cached_trees()
+    data = CategorySerializer([root for root in roots if root.is_active], many=True).data
+    content = JSONRenderer().render(data)
+    etag = '"%s"' % hashlib.md5(content).hexdigest()
+    return etag, content
+
+
+def get_category_tree():
+    tree = cache.get(CATEGORY_TREE_KEY)
+    if tree is None:
+        tree = build_category_tree()
+        cache.set(CATEGORY_TREE_KEY, tree, timeout=None)
+    return tree
+
+
+def invalidate_category_tree():
+    cache.delete(CATEGORY_TREE_KEY)
+
+
+def _feed_version_key(region_id):
+    return f'{EXECUTOR_FEED_PREFIX}:version:{region_id}'
+
+
+def get_feed_version(region_id):
+    # Начальная версия от времени: если ключ вытеснят, старые страницы не оживут
+    return cache.get_or_set(_feed_version_key(region_id), time.time_ns(), timeout=None)
+
+
+def invalidate_executor_feed(region_id):
+    """Новая версия региона — все закэшированные страницы его ленты становятся недоступны."""
+    try:
+        cache.incr(_feed_version_key(region_id))
+    except ValueError:
+        cache.set(_feed_version_key(region_id), time.time_ns(), timeout=None)
+
+
+def _count_feed(stat):
+    key = f'{EXECUTOR_FEED_PREFIX}:stats:{stat}'
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, timeout=None)
+        cache.incr(key)
+
+
+def get_executor_feed_stats():
+    counts = cache.get_many([f'{EXECUTOR_FEED_PREFIX}:stats:{stat}' for stat in FEED_STATS])
+    hits, misses = (counts.get(f'{EXECUTOR_FEED_PREFIX}:stats:{stat}', 0) for stat in FEED_STATS)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / total, 4) if total else None,
+        'miss_ratio': round(misses / total, 4) if total else None,
+    }
+
+
+def get_executor_feed_page(region_id, request, build):
+    """
+    Страница ленты исполнителя из кэша. Ключ учитывает версию региона, хост
+    (в ответе абсолютные ссылки) и строку запроса (курсор, page_size).
+
+    Пересобирает страницу только один запрос (single-flight): остальные
+    ждут его результат до FEED_LOCK_TIMEOUT, а потом собирают сами.
+    """
+    version = get_feed_version(region_id)
+    page_hash = hashlib.md5(f'{request.get_host()}{request.get_full_path()}'.encode()).hexdigest()
+    key = f'{EXECUTOR_FEED_PREFIX}:{region_id}:{version}:{page_hash}'
+
+    data = cache.get(key)
+    if data is not None:
+        _count_feed('hits')
+        return data
+
+    _count_feed('misses')
+    lock_key = f'{key}:lock'
+    if not cache.add(lock_key, 1, timeout=FEED_LOCK_TIMEOUT):
+        deadline = time.monotonic() + FEED_LOCK_TIMEOUT
+        while time.monotonic() < deadline:
+            time.sleep(FEED_WAIT_STEP)
+            data = cache.get(key)
+            if data is not None:
+                return data
+        return build()
+
+    try:
+        data = build()
+        cache.set(key, data, timeout=settings.EXECUTOR_FEED_CACHE_TIMEOUT)
+    finally:
+        cache.delete(lock_key)
+    return data
@@ -0,0 +1,137 @@
+"""
+Массовый импорт дерева категорий.
+
+Все категории создаются в одной транзакции через bulk_create (по одному
+запросу на уровень дерева), слаги подбираются в памяти по заранее
+загруженному множеству существующих, а MPTT перестраивается один раз в конце.
+"""
+import csv
+import json
+
+from django.db import transaction
+from django.utils.text import slugify
+
+from apps.orders.cache import invalidate_category_tree
+from apps.orders.models import Category
+
+
+class CategoryImportError(ValueError):
+    pass
+
+
+def unique_slug(title, taken_slugs):
+    """
+    Уникальный слаг по тем же правилам, что и Category.save,
+    но проверка идёт по множеству в памяти. Выбранный слаг добавляется в taken_slugs.
+    """
+    base_slug = slugify(title)
+    slug = base_slug
+    counter = 1
+    while slug in taken_slugs:
+        slug = f"{base_slug}-{counter}"
+        counter += 1
+    taken_slugs.add(slug)
+    return slug
+
+
+def load_json(stream):
+    """
+    JSON: список узлов вида {"title": ..., "is_active": true, "children": [...]}.
+    Узел верхнего уровня может указать "parent" — слаг существующей категории.
+    """
+    try:
+        nodes = json.load(stream)
+    except json.JSONDecodeError as e:
+        raise CategoryImportError(f"Некорректный JSON: {e}")
+    if not isinstance(nodes, list):
+        raise CategoryImportError("Ожидается список категорий верхнего уровня.")
+    return nodes
+
+
+def load_csv(stream, separator='/'):
+    """
+    CSV с колонками path и (необязательно) is_active,
+    где path — путь вида "Строительство/Кровля/Битум".
+    Промежуточные категории пути создаются автоматически.
+    """
+    roots = []
+    index = {}
+    for line, row in enumerate(csv.DictReader(stream), start=2):
+        path = [part.strip() for part in (row.get('path') or '').split(separator) if part.strip()]
+        if not path:
+            raise CategoryImportError(f"Строка {line}: пустой path.")
+
+        siblings, key = roots, ()
+        for title in path:
+            key += (title,)
+            node = index.get(key)
+            if node is None:
+                node = index[key] = {'title': title, 'children': []}
+                siblings.append(node)
+            siblings = node['children']
+
+        is_active = (row.get('is_active') or '').strip().lower()
+        if is_active:
+            node['is_active'] = is_active not in ('0', 'false', 'no', 'нет')
+    return roots
+
+
+def _node_slug(node, taken_slugs):
+    slug = node.get('slug')
+    if not slug:
+        return unique_slug(node['title'], taken_slugs)
+    if slug in taken_slugs:
+        raise CategoryImportError(f"Слаг уже занят: {slug}")
+    taken_slugs.add(slug)
+    return slug
+
+
+def _validate(nodes, level=0):
+    for node in nodes:
+        if not isinstance(node, dict) or not str(node.get('title') or '').strip():
+            raise CategoryImportError("У каждой категории должен быть непустой title.")
+        if level and node.get('parent'):
+            raise CategoryImportError("parent допустим только у категорий верхнего уровня.")
+        _validate(node.get('children') or [], level + 1)
+
+
+@transaction.atomic
+def import_category_tree(nodes, batch_size=500):
+    """
+    Создаёт категории из вложенного списка узлов. Возвращает число созданных категорий.
+    """
+    _validate(nodes)
+
+    taken_slugs = set(Category.objects.values_list('slug', flat=True))
+    parent_slugs = {node['parent'] for node in nodes if node.get('parent')}
+    parents = Category.objects.in_bulk(parent_slugs, field_name='slug')
+    missing = parent_slugs - set(parents)
+    if missing:
+        raise CategoryImportError(f"Не найдены родительские категории: {', '.join(sorted(missing))}")
+
+    created = 0
+    level = [(node, parents.get(node.get('parent'))) for node in nodes]
+    while level:
+        categories = [
+            Category(
+                title=str(node['title']).strip(),
+                slug=_node_slug(node, taken_slugs),
+                is_active=node.get('is_active', True),
+                parent=parent,
+                # Настоящие значения MPTT-полей выставит rebuild()
+                lft=0, rght=0, tree_id=0, level=0,
+            )
+            for node, parent in level
+        ]
+        Category.objects.bulk_create(categories, batch_size=batch_size)
+        created += len(categories)
+
+        level = [
+            (child, category)
+            for (node, _), category in zip(level, categories)
+            for child in node.get('children') or []
+        ]
+
+    Category.objects.rebuild()
+    transaction.on_commit(invalidate_category_tree)
+    return created
@@ -0,0 +1,71 @@
+import math
+
+# Размер ячейки сетки в градусах (~11 км по широте)
+GEO_CELL_SIZE = 0.1
+GEO_CELL_COLUMNS = int(round(360 / GEO_CELL_SIZE))
+EARTH_RADIUS_KM = 6371.0
+
+
+def _cell_row(latitude):
+    return int(math.floor((latitude + 90) / GEO_CELL_SIZE))
+
+
+def _cell_column(longitude):
+    return int(math.floor((longitude + 180) / GEO_CELL_SIZE)) % GEO_CELL_COLUMNS
+
+
+def geo_cell(latitude, longitude):
+    """
+    Номер ячейки сетки для точки. Ячейки одной широтной полосы идут подряд,
+    поэтому прямоугольник на карте раскладывается в несколько диапазонов.
+    """
+    if latitude is None or longitude is None:
+        return None
+    return _cell_row(latitude) * GEO_CELL_COLUMNS + _cell_column(longitude)
+
+
+def bounding_box(latitude, longitude, radius_km):
+    """
+    Прямоугольник (min_lat, max_lat, min_lon, max_lon), гарантированно
+    содержащий круг радиуса radius_km.
+    """
+    delta_lat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    min_lat = max(latitude - delta_lat, -90.0)
+    max_lat = min(latitude + delta_lat, 90.0)
+
+    cos_lat = math.cos(math.radians(max(abs(min_lat), abs(max_lat))))
+    if cos_lat <= 0 or delta_lat / cos_lat >= 180:
+        return min_lat, max_lat, -180.0, 180.0
+    delta_lon = delta_lat / cos_lat
+    return min_lat, max_lat, longitude - delta_lon, longitude + delta_lon
+
+
+def geo_cell_ranges(min_lat, max_lat, min_lon, max_lon):
+    """
+    Список диапазонов (start, end) номеров ячеек, покрывающих прямоугольник.
+    Прямоугольник, пересекающий 180-й меридиан, делится на две части.
+    """
+    if max_lon - min_lon >= 360:
+        column_spans = [(0, GEO_CELL_COLUMNS - 1)]
+    else:
+        first, last = _cell_column(min_lon), _cell_column(max_lon)
+        if first <= last:
+            column_spans = [(first, last)]
+        else:
+            column_spans = [(first, GEO_CELL_COLUMNS - 1), (0, last)]
+
+    ranges = []
+    for row in range(_cell_row(min_lat), _cell_row(max_lat) + 1):
+        offset = row * GEO_CELL_COLUMNS
+        for first, last in column_spans:
+            ranges.append((offset + first, offset + last))
+    return ranges
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Расстояние по большому кругу между двумя точками, км."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
@@ -0,0 +1,104 @@
+import multiprocessing
+import os
+import statistics
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from PIL import Image
+
+from apps.utils import decode_image, peak_rss_kb
+
+
+def _legacy_decode(path, size):
+    # Прежний путь: полное декодирование в исходном разрешении, затем уменьшение
+    img = Image.open(path)
+    img = img.convert("RGB")
+    img.thumbnail(size)
+    return img
+
+
+def _draft_decode(path, size):
+    return decode_image(path, size)
+
+
+METHODS = {
+    'legacy': _legacy_decode,
+    'draft': _draft_decode,
+}
+
+
+def _measure(method, path, size, repeat):
+    """
+    Запускается в отдельном процессе, чтобы пик RSS относился только к одному способу.
+    Возвращает (список времён в секундах, прирост пикового RSS в КБ).
+    """
+    decode = METHODS[method]
+    baseline = peak_rss_kb()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        decode(path, size)
+        timings.append(time.perf_counter() - started)
+    peak = peak_rss_kb()
+    return timings, peak - baseline
+
+
+def _make_sample(megapixels):
+    width = int((megapixels * 1_000_000 * 4 / 3) ** 0.5)
+    height = int(width * 3 / 4)
+    channels = [Image.linear_gradient('L'), Image.radial_gradient('L'), Image.linear_gradient('L').rotate(90)]
+    img = Image.merge('RGB', [channel.resize((width, height)) for channel in channels])
+
+    handle, path = tempfile.mkstemp(suffix='.jpg')
+    os.close(handle)
+    img.save(path, format='JPEG', quality=90)
+    return path
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает прежнее полное декодирование изображений с decode_image "
+        "(проверка заголовка + JPEG draft): время и пиковый RSS."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='*', help="Файлы изображений; по умолчанию генерируется JPEG")
+        parser.add_argument('--megapixels', type=float, default=50, help="Размер генерируемого JPEG, Мп")
+        parser.add_argument('--size', type=int, default=1024, help="Целевая сторона, px")
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        paths = options['paths']
+        sample = None
+        if not paths:
+            sample = _make_sample(options['megapixels'])
+            paths = [sample]
+
+        size = (options['size'], options['size'])
+        context = multiprocessing.get_context('spawn')
+        try:
+            for path in paths:
+                with Image.open(path) as img:
+                    self.stdout.write(f"{os.path.basename(path)}: {img.width}x{img.height} {img.format}")
+
+                results = {}
+                for method in METHODS:
+                    with context.Pool(1) as pool:
+                        results[method] = pool.apply(_measure, (method, path, size, options['repeat']))
+
+                for method, (timings, rss_kb) in results.items():
+                    self.stdout.write(
+                        f"  {method:<7} median {statistics.median(timings) * 1000:8.1f} ms"
+                        f"   peak RSS +{rss_kb / 1024:7.1f} MB"
+                    )
+
+                legacy_time = statistics.median(results['legacy'][0])
+                draft_time = statistics.median(results['draft'][0])
+                self.stdout.write(self.style.SUCCESS(
+                    f"  ускорение x{legacy_time / draft_time:.1f}, "
+                    f"экономия памяти {(results['legacy'][1] - results['draft'][1]) / 1024:.1f} MB"
+                ))
+        finally:
+            if sample:
+                os.remove(sample)
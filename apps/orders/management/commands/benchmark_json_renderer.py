@@ -0,0 +1,92 @@
+import json
+import statistics
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+
+from apps.orders.models import OrderImage, Orders
+from apps.orders.serializers import OrderListSerializer, OrderSerializer
+from apps.renderers import FastJSONRenderer, orjson
+
+RENDERERS = {
+    'drf': JSONRenderer,
+    'fast': FastJSONRenderer,
+}
+
+
+def _make_orders(count):
+    """Несохранённые заказы с фото: сериализатор не ходит в БД."""
+    now = timezone.now()
+    orders = []
+    for i in range(count):
+        order = Orders(
+            id=i + 1, title=f"Ремонт квартиры под ключ №{i}", description="Нужно покрасить стены, " * 40,
+            created_at=now - timedelta(minutes=i), created_by_id=1, region_id=1, type_orders_id=1,
+            price_for_executor=50, budget=15000 + i, deadline=date.today() + timedelta(days=7),
+            contact_phone="+996700123456", latitude=42.87 + i / 1000, longitude=74.59 + i / 1000,
+        )
+        images = []
+        for j in range(3):
+            renditions = {
+                str(size): {'name': f'order_images/photo_{i}_{j}_{size}.webp', 'width': size, 'height': size * 3 // 4}
+                for size in OrderImage.RENDITION_SIZES
+            }
+            images.append(OrderImage(id=i * 3 + j + 1, image=renditions['1024']['name'], renditions=renditions))
+        order._prefetched_objects_cache = {'images': images}
+        orders.append(order)
+    return orders
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает стандартный JSONRenderer DRF с FastJSONRenderer на страницах заказов "
+        "(полная и компактная карточка) и проверяет, что выдача совпадает."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page-sizes', default='20,100', help="Размеры страниц через запятую")
+        parser.add_argument('--repeat', type=int, default=200)
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            self.stdout.write(self.style.WARNING("orjson не установлен — FastJSONRenderer работает как JSONRenderer"))
+
+        request = APIRequestFactory().get('/api/v1/orders/executor/orders/', HTTP_HOST='localhost')
+        for page_size in [int(size) for size in options['page_sizes'].split(',')]:
+            orders = _make_orders(page_size)
+            for serializer_class in (OrderListSerializer, OrderSerializer):
+                results = serializer_class(orders, many=True, context={'request': request}).data
+                data = {
+                    'next': 'http://localhost/api/v1/orders/executor/orders/?cursor=cD0yMDI2',
+                    'previous': None,
+                    'results': results,
+                    # Типы, которые отдаёт не сериализатор, а код представлений
+                    'generated_at': timezone.now(),
+                    'total_budget': Decimal('12345.67'),
+                    'note': gettext_lazy("Заказы"),
+                }
+
+                rendered, timings = {}, {}
+                for name, renderer_class in RENDERERS.items():
+                    renderer = renderer_class()
+                    runs = []
+                    for _ in range(options['repeat']):
+                        started = time.perf_counter()
+                        rendered[name] = renderer.render(data, 'application/json')
+                        runs.append(time.perf_counter() - started)
+                    timings[name] = statistics.median(runs)
+
+                same = json.loads(rendered['drf']) == json.loads(rendered['fast'])
+                self.stdout.write(
+                    f"{serializer_class.__name__:<20} {page_size:>4} заказов, {len(rendered['drf']) / 1024:7.1f} KB | "
+                    f"drf {timings['drf'] * 1000:7.3f} ms  fast {timings['fast'] * 1000:7.3f} ms  "
+                    f"x{timings['drf'] / timings['fast']:.1f} | "
+                    f"{'выдача совпадает' if same else 'ВЫДАЧА РАЗЛИЧАЕТСЯ'}"
+                    f"{', байт в байт' if rendered['drf'] == rendered['fast'] else ''}"
+                )
@@ -0,0 +1,109 @@
+import statistics
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection, transaction
+
+from apps.orders.models import Orders
+from apps.users.models import User
+from apps.utils import throwaway_database
+
+
+def _legacy_take(order_id, executor):
+    # Прежний путь take_order: блокировка строки и полное сохранение заказа
+    with transaction.atomic():
+        order = Orders.objects.select_for_update().get(pk=order_id)
+        if order.is_taken or not order.is_paid:
+            return False
+        order.executor = executor
+        order.is_taken = True
+        order.save()
+        return True
+
+
+def _conditional_take(order_id, executor):
+    return Orders.objects.claim(order_id, executor)
+
+
+METHODS = {
+    'legacy': _legacy_take,
+    'claim': _conditional_take,
+}
+
+
+def _percentile(values, q):
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Нагрузочный тест взятия заказа: много исполнителей одновременно берут "
+        "один оплаченный заказ. Проверяет, что побеждает ровно один, и сравнивает задержки "
+        "при растущей конкуренции. Работает во временной базе, как тесты."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--claimers', type=int, nargs='+', default=[2, 4, 8, 16, 32],
+                            help="Числа одновременных исполнителей на заказ, по каждому отдельный замер")
+        parser.add_argument('--orders', type=int, default=20, help="Сколько заказов разыграть на замер")
+
+    def run(self, method, executors, customer, options):
+        timings, errors, failed_rounds = [], 0, 0
+        for _ in range(options['orders']):
+            order = Orders.objects.create(
+                title='benchmark', description='benchmark', created_by=customer,
+                budget=1, contact_phone='0', is_paid=True,
+            )
+            barrier = threading.Barrier(len(executors))
+            wins, lock = [], threading.Lock()
+
+            def claimer(executor):
+                nonlocal errors
+                barrier.wait()
+                started = time.perf_counter()
+                try:
+                    won = METHODS[method](order.pk, executor)
+                except OperationalError:
+                    won = False
+                    with lock:
+                        errors += 1
+                finally:
+                    connection.close()
+                with lock:
+                    timings.append(time.perf_counter() - started)
+                    if won:
+                        wins.append(executor.pk)
+
+            threads = [threading.Thread(target=claimer, args=(executor,)) for executor in executors]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            stored = Orders.objects.values_list('executor_id', flat=True).get(pk=order.pk)
+            if len(wins) != 1 or stored != wins[0]:
+                failed_rounds += 1
+            order.delete()
+
+        timings.sort()
+        self.stdout.write(
+            f"{method:<7} x{len(executors):<3} p50 {statistics.median(timings) * 1000:6.1f} ms"
+            f"  p95 {_percentile(timings, 0.95) * 1000:6.1f} ms  p99 {_percentile(timings, 0.99) * 1000:6.1f} ms"
+            f" | ошибок БД {errors} | раундов без единственного победителя {failed_rounds} из {options['orders']}"
+        )
+        if failed_rounds:
+            self.stdout.write(self.style.ERROR("  гонка: победителей не ровно один"))
+        else:
+            self.stdout.write(self.style.SUCCESS("  в каждом раунде ровно один победитель"))
+
+    def handle(self, *args, **options):
+        with throwaway_database():
+            customer = User.objects.create(username='bench-customer', email='bench-customer@bench.local')
+            executors = [
+                User.objects.create(username=f'bench-{i}', email=f'bench-{i}@bench.local')
+                for i in range(max(options['claimers']))
+            ]
+            for claimers in sorted(options['claimers']):
+                for method in METHODS:
+                    self.run(method, executors[:claimers], customer, options)
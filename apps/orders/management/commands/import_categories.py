@@ -0,0 +1,33 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.orders.category_import import CategoryImportError, import_category_tree, load_csv, load_json
+
+
+class Command(BaseCommand):
+    help = "Импортирует дерево категорий из JSON или CSV одной транзакцией."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Путь к файлу .json или .csv")
+        parser.add_argument(
+            '--format', choices=['json', 'csv'],
+            help="Формат файла (по умолчанию определяется по расширению)"
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or os.path.splitext(path)[1].lstrip('.').lower()
+        if file_format not in ('json', 'csv'):
+            raise CommandError("Укажите --format json или csv.")
+
+        try:
+            with open(path, encoding='utf-8', newline='') as stream:
+                nodes = load_json(stream) if file_format == 'json' else load_csv(stream)
+            created = import_category_tree(nodes)
+        except OSError as e:
+            raise CommandError(f"Не удалось прочитать файл: {e}")
+        except CategoryImportError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(f"Создано категорий: {created}"))
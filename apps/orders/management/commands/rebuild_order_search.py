@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.orders import search
+
+
+class Command(BaseCommand):
+    help = (
+        "Перестраивает полнотекстовый индекс заказов. Нужен после массовых "
+        "загрузок через bulk_create/update(), которые не вызывают сигналы."
+    )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            count = search.rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f"Проиндексировано заказов: {count}"))
@@ -0,0 +1,21 @@
+# Generated by Django 4.2 on 2026-10-18 14:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='orders',
+            index=models.Index(fields=['region', 'is_taken', '-created_at', '-id'], name='orders_region_open_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='orders',
+            index=models.Index(fields=['created_by', '-created_at', '-id'], name='orders_author_created_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2 on 2026-10-18 14:33
+
+from django.db import migrations, models
+
+from apps.orders.geo import geo_cell
+
+
+def fill_geo_cells(apps, schema_editor):
+    Orders = apps.get_model('orders', 'Orders')
+    orders = list(
+        Orders.objects.filter(latitude__isnull=False, longitude__isnull=False).only('id', 'latitude', 'longitude')
+    )
+    for order in orders:
+        order.geo_cell = geo_cell(order.latitude, order.longitude)
+    Orders.objects.bulk_update(orders, ['geo_cell'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0003_orders_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orders',
+            name='geo_cell',
+            field=models.BigIntegerField(blank=True, editable=False, null=True, verbose_name='Ячейка геосетки'),
+        ),
+        migrations.AddIndex(
+            model_name='orders',
+            index=models.Index(fields=['is_taken', 'geo_cell'], name='orders_open_geo_cell_idx'),
+        ),
+        migrations.RunPython(fill_geo_cells, migrations.RunPython.noop),
+    ]
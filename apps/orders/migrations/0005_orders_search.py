@@ -0,0 +1,70 @@
+import sqlite3
+
+from django.db import migrations
+
+# SQL зафиксирован на момент миграции и не зависит от apps.orders.search
+
+
+def _sqlite_has_fts5():
+    probe = sqlite3.connect(':memory:')
+    try:
+        probe.execute("CREATE VIRTUAL TABLE fts5_probe USING fts5(body)")
+    except sqlite3.OperationalError:
+        return False
+    finally:
+        probe.close()
+    return True
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    with schema_editor.connection.cursor() as cursor:
+        if vendor == 'sqlite':
+            # Без FTS5 индекс не создаётся, поиск работает через icontains
+            if not _sqlite_has_fts5():
+                return
+            cursor.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS orders_search "
+                "USING fts5(title, description, tokenize = 'unicode61 remove_diacritics 2')"
+            )
+            cursor.execute(
+                "INSERT INTO orders_search (rowid, title, description) "
+                "SELECT id, title, description FROM orders_orders"
+            )
+        elif vendor == 'postgresql':
+            # Без внешнего ключа: таблицы нет в состоянии моделей Django, и ссылка
+            # ломала бы flush и TRUNCATE orders_orders. Строки удаляют сигналы заказа.
+            cursor.execute(
+                "CREATE TABLE IF NOT EXISTS orders_search ("
+                "order_id bigint PRIMARY KEY, "
+                "document tsvector NOT NULL)"
+            )
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS orders_search_document_gin "
+                "ON orders_search USING GIN (document)"
+            )
+            cursor.execute(
+                "INSERT INTO orders_search (order_id, document) "
+                "SELECT id, "
+                "setweight(to_tsvector('russian', coalesce(title, '')), 'A') || "
+                "setweight(to_tsvector('russian', coalesce(description, '')), 'B') "
+                "FROM orders_orders"
+            )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql' or (vendor == 'sqlite' and _sqlite_has_fts5()):
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute("DROP TABLE IF EXISTS orders_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0004_orders_geo_cell'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2 on 2026-10-18 14:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0005_orders_search'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='category',
+            index=models.Index(fields=['tree_id', 'lft', 'rght'], name='category_tree_range_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-18 14:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0006_category_tree_range_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderimage',
+            name='renditions',
+            field=models.JSONField(blank=True, default=dict, verbose_name='Копии разных размеров'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2 on 2026-10-18 14:53
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def fill_updated_at(apps, schema_editor):
+    Orders = apps.get_model('orders', 'Orders')
+    Orders.objects.update(updated_at=F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0007_orderimage_renditions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orders',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Дата изменения'),
+        ),
+        migrations.RunPython(fill_updated_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+from django.db import migrations
+
+
+def drop_search_fk(apps, schema_editor):
+    # Базы, мигрировавшие прежней 0005, держат внешний ключ orders_search → orders_orders,
+    # о котором Django не знает: flush и TRUNCATE orders_orders на нём падают
+    if schema_editor.connection.vendor == 'postgresql':
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(
+                "ALTER TABLE IF EXISTS orders_search "
+                "DROP CONSTRAINT IF EXISTS orders_search_order_id_fkey"
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0008_orders_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_search_fk, migrations.RunPython.noop),
+    ]
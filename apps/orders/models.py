@@ -1,6 +1,10 @@
-from django.db import models
-import os
-from apps.utils import convert_image_to_webp
+import math
+
+from django.db import models, transaction
+from django.utils import timezone
+from django.db.models import F, Q
+from django.db.models.functions import Abs, Least
+from apps.orders.geo import bounding_box, geo_cell, geo_cell_ranges
 from django.conf import settings
 from apps.users.models import UserRegion
 from mptt.models import MPTTModel, TreeForeignKey
@@ -26,6 +30,10 @@ class Category(MPTTModel):
     class Meta:
         verbose_name = 'Категория'
         verbose_name_plural = 'Категории'
+        indexes = [
+            # Выборка поддерева одним диапазоном по lft внутри дерева
+            models.Index(fields=['tree_id', 'lft', 'rght'], name='category_tree_range_idx'),
+        ]
 
     def __str__(self):
         return self.title
@@ -42,10 +50,75 @@ class Category(MPTTModel):
         super().save(*args, **kwargs)
 
 
+class OrdersQuerySet(models.QuerySet):
+    def with_related(self):
+        """
+        Подгружает связанные строки и фото одним фиксированным набором запросов,
+        независимо от размера страницы.
+        """
+        return self.select_related(
+            'region', 'type_orders', 'created_by', 'executor'
+        ).prefetch_related('images')
+
+    def in_category(self, category):
+        """
+        Заказы категории и всех её потомков: один диапазон по lft
+        внутри дерева MPTT, без списка id.
+        """
+        return self.filter(
+            type_orders__tree_id=category.tree_id,
+            type_orders__lft__range=(category.lft, category.rght),
+        )
+
+    def within_bounding_box(self, latitude, longitude, radius_km):
+        """
+        Грубый отбор заказов вокруг точки по индексированной ячейке сетки
+        и прямоугольнику координат. Точное расстояние считается уже для отобранных.
+        """
+        min_lat, max_lat, min_lon, max_lon = bounding_box(latitude, longitude, radius_km)
+
+        cells = Q()
+        for start, end in geo_cell_ranges(min_lat, max_lat, min_lon, max_lon):
+            cells |= Q(geo_cell__range=(start, end))
+
+        queryset = self.filter(cells, latitude__range=(min_lat, max_lat))
+        if -180 <= min_lon and max_lon <= 180:
+            queryset = queryset.filter(longitude__range=(min_lon, max_lon))
+        return queryset
+
+    def order_by_approx_distance(self, latitude, longitude):
+        """
+        Сортировка по квадрату расстояния на плоскости (равнопромежуточная проекция):
+        считается в SQL и на радиусах до сотни километров почти не отличается
+        от порядка по haversine_km.
+        """
+        d_lat = F('latitude') - latitude
+        # Разница долгот с учётом перехода через 180-й меридиан
+        d_lon = Abs(F('longitude') - longitude)
+        d_lon = Least(d_lon, 360 - d_lon) * math.cos(math.radians(latitude))
+        return self.alias(approx_distance=d_lat * d_lat + d_lon * d_lon).order_by('approx_distance')
+
+    def touch(self):
+        """Обновляет updated_at — для изменений через update(), которые auto_now не видит."""
+        return self.update(updated_at=timezone.now())
+
+    def claim(self, order_id, executor):
+        """
+        Закрепляет оплаченный свободный заказ за исполнителем одним условным UPDATE,
+        без блокировки строки. True — заказ достался этому исполнителю;
+        из одновременных запросов True получает ровно один.
+        """
+        return self.filter(pk=order_id, is_taken=False, is_paid=True).update(
+            executor=executor, is_taken=True, updated_at=timezone.now()
+        ) == 1
+
+
 class Orders(models.Model):
     title = models.CharField(max_length=155, verbose_name='Заголовок')
     description = models.TextField(verbose_name='Описание')
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')
+    # Меняется при любом изменении заказа и его фото — валидатор для ETag
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Дата изменения')
 
     created_by = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -81,33 +154,48 @@ class Orders(models.Model):
 
     latitude = models.FloatField(null=True, blank=True, verbose_name='Широта')
     longitude = models.FloatField(null=True, blank=True, verbose_name='Долгота')
+    geo_cell = models.BigIntegerField(null=True, blank=True, editable=False, verbose_name='Ячейка геосетки')
+
+    objects = OrdersQuerySet.as_manager()
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        self.geo_cell = geo_cell(self.latitude, self.longitude)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'latitude', 'longitude'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'geo_cell'}
+        super().save(*args, **kwargs)
+
     class Meta:
         verbose_name = 'Заказ'
         verbose_name_plural = 'Заказы'
+        indexes = [
+            # Лента исполнителя: открытые заказы региона, новые сверху
+            models.Index(fields=['region', 'is_taken', '-created_at', '-id'], name='orders_region_open_created_idx'),
+            # Лента заказчика: его заказы, новые сверху
+            models.Index(fields=['created_by', '-created_at', '-id'], name='orders_author_created_idx'),
+            # Поиск заказов рядом: открытые заказы по ячейке геосетки
+            models.Index(fields=['is_taken', 'geo_cell'], name='orders_open_geo_cell_idx'),
+        ]
 
 
 class OrderImage(models.Model):
+    # Размеры webp-копий; самая большая становится основным фото
+    RENDITION_SIZES = (1024, 480, 160)
+
     order = models.ForeignKey(Orders, on_delete=models.CASCADE, related_name='images')
     image = models.ImageField(upload_to='order_images/', verbose_name='Фото')
+    renditions = models.JSONField(default=dict, blank=True, verbose_name='Копии разных размеров')
 
     def save(self, *args, **kwargs):
-        original_image = self.image
         super().save(*args, **kwargs)
 
         if self.image and not self.image.name.endswith('.webp'):
-            webp_filename, webp_content = convert_image_to_webp(original_image, upload_to='order_images/', resize_to=(1024, 1024))
-
-            old_path = self.image.path
-            self.image.save(webp_filename, webp_content, save=False)
-
-            if os.path.exists(old_path):
-                os.remove(old_path)
-
-            super().save(update_fields=['image'])
+            # Конвертация в webp идёт в Celery, запрос не ждёт PIL
+            from apps.orders.tasks import convert_order_image_task
+            transaction.on_commit(lambda: convert_order_image_task.delay(self.pk))
 
     class Meta:
         verbose_name = 'Фото заказа'
@@ -0,0 +1,14 @@
+from rest_framework.pagination import CursorPagination
+
+
+class OrderCursorPagination(CursorPagination):
+    """
+    Курсорная (keyset) пагинация ленты заказов.
+
+    Позиция страницы кодируется в курсоре по created_at, поэтому выборка
+    N-й страницы опирается на индекс и стоит столько же, сколько первой.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('-created_at', '-id')
@@ -0,0 +1,240 @@
+"""
+Полнотекстовый поиск по заголовку и описанию заказов.
+
+Индекс хранится в отдельной таблице orders_search:
+- SQLite: виртуальная таблица FTS5 (rowid = id заказа);
+- PostgreSQL: tsvector с GIN-индексом.
+На остальных СУБД, а также на сборках SQLite без FTS5 (например, той, что
+приходит вместе с TensorFlow) индекс не ведётся и поиск деградирует до icontains.
+Если база мигрировала без FTS5, индекс создаётся командой rebuild_order_search.
+"""
+import re
+import sqlite3
+from functools import lru_cache
+
+from django.db import connection
+from django.db.models import Q
+
+SEARCH_TABLE = 'orders_search'
+SEARCH_CONFIG = 'russian'
+
+# Заголовок весит больше описания
+TITLE_WEIGHT = 10.0
+DESCRIPTION_WEIGHT = 1.0
+
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+# Базы SQLite, в которых таблица индекса уже есть: (alias, NAME)
+_sqlite_indexed = set()
+
+
+@lru_cache(maxsize=None)
+def fts5_available():
+    """
+    Поддерживает ли FTS5 библиотека SQLite, к которой привязан модуль sqlite3.
+    Библиотека одна на процесс, поэтому проверка выполняется один раз.
+    """
+    probe = sqlite3.connect(':memory:')
+    try:
+        probe.execute("CREATE VIRTUAL TABLE fts5_probe USING fts5(body)")
+    except sqlite3.OperationalError:
+        return False
+    finally:
+        probe.close()
+    return True
+
+
+def _sqlite_key(conn):
+    return conn.alias, str(conn.settings_dict['NAME'])
+
+
+def _has_sqlite_index(conn):
+    key = _sqlite_key(conn)
+    if key in _sqlite_indexed:
+        return True
+    if SEARCH_TABLE in conn.introspection.table_names():
+        _sqlite_indexed.add(key)
+        return True
+    return False
+
+
+def _vendor(conn=None, require_index=True):
+    """
+    Движок индекса: 'sqlite', 'postgresql' или None, если индекса нет
+    и поиск идёт через icontains.
+    """
+    conn = conn or connection
+    if conn.vendor == 'sqlite':
+        if not fts5_available():
+            return None
+        if require_index and not _has_sqlite_index(conn):
+            return None
+    return conn.vendor
+
+
+def _postgres_document(title_sql, description_sql):
+    return (
+        f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce({title_sql}, '')), 'A') || "
+        f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce({description_sql}, '')), 'B')"
+    )
+
+
+def create_index(conn):
+    """
+    Создаёт таблицу индекса, если её нет (см. rebuild_index). Внешнего ключа
+    на orders_orders нет: Django не знает о таблице, и ссылка ломала бы flush
+    и TRUNCATE заказов. Строки удалённых заказов убирают сигналы.
+    """
+    vendor = _vendor(conn, require_index=False)
+    with conn.cursor() as cursor:
+        if vendor == 'sqlite':
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} "
+                f"USING fts5(title, description, tokenize = 'unicode61 remove_diacritics 2')"
+            )
+        elif vendor == 'postgresql':
+            cursor.execute(
+                f"CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} ("
+                f"order_id bigint PRIMARY KEY, "
+                f"document tsvector NOT NULL)"
+            )
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS {SEARCH_TABLE}_document_gin "
+                f"ON {SEARCH_TABLE} USING GIN (document)"
+            )
+
+
+def drop_index(conn):
+    if conn.vendor == 'sqlite':
+        _sqlite_indexed.discard(_sqlite_key(conn))
+    # Без FTS5 SQLite не удалит виртуальную таблицу — таблицы тогда и не было
+    if _vendor(conn, require_index=False) in ('sqlite', 'postgresql'):
+        with conn.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")
+
+
+def rebuild_index(conn=None):
+    """
+    Полностью перестраивает индекс одним INSERT ... SELECT, при необходимости
+    создавая таблицу. Возвращает количество проиндексированных заказов.
+    """
+    conn = conn or connection
+    create_index(conn)
+    vendor = _vendor(conn)
+    with conn.cursor() as cursor:
+        if vendor == 'sqlite':
+            cursor.execute(f"DELETE FROM {SEARCH_TABLE}")
+            cursor.execute(
+                f"INSERT INTO {SEARCH_TABLE} (rowid, title, description) "
+                f"SELECT id, title, description FROM orders_orders"
+            )
+        elif vendor == 'postgresql':
+            cursor.execute(f"TRUNCATE {SEARCH_TABLE}")
+            cursor.execute(
+                f"INSERT INTO {SEARCH_TABLE} (order_id, document) "
+                f"SELECT id, {_postgres_document('title', 'description')} FROM orders_orders"
+            )
+        else:
+            return 0
+        return cursor.rowcount
+
+
+def index_order(order):
+    """Добавляет или обновляет заказ в индексе."""
+    vendor = _vendor()
+    with connection.cursor() as cursor:
+        if vendor == 'sqlite':
+            cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s", [order.pk])
+            cursor.execute(
+                f"INSERT INTO {SEARCH_TABLE} (rowid, title, description) VALUES (%s, %s, %s)",
+                [order.pk, order.title, order.description],
+            )
+        elif vendor == 'postgresql':
+            cursor.execute(
+                f"INSERT INTO {SEARCH_TABLE} (order_id, document) "
+                f"VALUES (%s, {_postgres_document('%s', '%s')}) "
+                f"ON CONFLICT (order_id) DO UPDATE SET document = EXCLUDED.document",
+                [order.pk, order.title, order.description],
+            )
+
+
+def index_orders(order_ids):
+    """
+    Индексирует пачку заказов одним INSERT ... SELECT — для заказов,
+    созданных через bulk_create, который не вызывает сигналы.
+    """
+    if not order_ids:
+        return
+    placeholders = ', '.join(['%s'] * len(order_ids))
+    vendor = _vendor()
+    with connection.cursor() as cursor:
+        if vendor == 'sqlite':
+            cursor.execute(
+                f"INSERT INTO {SEARCH_TABLE} (rowid, title, description) "
+                f"SELECT id, title, description FROM orders_orders WHERE id IN ({placeholders})",
+                list(order_ids),
+            )
+        elif vendor == 'postgresql':
+            cursor.execute(
+                f"INSERT INTO {SEARCH_TABLE} (order_id, document) "
+                f"SELECT id, {_postgres_document('title', 'description')} FROM orders_orders "
+                f"WHERE id IN ({placeholders}) "
+                f"ON CONFLICT (order_id) DO UPDATE SET document = EXCLUDED.document",
+                list(order_ids),
+            )
+
+
+def remove_order(order_id):
+    vendor = _vendor()
+    with connection.cursor() as cursor:
+        if vendor == 'sqlite':
+            cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s", [order_id])
+        elif vendor == 'postgresql':
+            cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE order_id = %s", [order_id])
+
+
+def _terms(query):
+    return _WORD_RE.findall(query.lower())
+
+
+def search(queryset, query):
+    """
+    Ограничивает queryset заказами, подходящими под запрос, и сортирует их
+    по релевантности (поле rank). Фильтры queryset применяются в том же SQL-запросе.
+    """
+    terms = _terms(query)
+    if not terms:
+        return queryset.none()
+
+    table = queryset.model._meta.db_table
+    vendor = _vendor()
+    if vendor == 'sqlite':
+        # Каждое слово — префиксный терм в кавычках, так пользовательский ввод
+        # не интерпретируется как синтаксис FTS5
+        match = ' '.join(f'"{term}"*' for term in terms)
+        return queryset.extra(
+            tables=[SEARCH_TABLE],
+            where=[f"{SEARCH_TABLE}.rowid = {table}.id", f"{SEARCH_TABLE} MATCH %s"],
+            params=[match],
+            select={'rank': f"bm25({SEARCH_TABLE}, {TITLE_WEIGHT}, {DESCRIPTION_WEIGHT})"},
+            order_by=['rank', '-id'],
+        )
+
+    if vendor == 'postgresql':
+        tsquery = ' & '.join(f'{term}:*' for term in terms)
+        return queryset.extra(
+            tables=[SEARCH_TABLE],
+            where=[
+                f"{SEARCH_TABLE}.order_id = {table}.id",
+                f"{SEARCH_TABLE}.document @@ to_tsquery('{SEARCH_CONFIG}', %s)",
+            ],
+            params=[tsquery],
+            select={'rank': f"-ts_rank({SEARCH_TABLE}.document, to_tsquery('{SEARCH_CONFIG}', %s))"},
+            select_params=[tsquery],
+            order_by=['rank', '-id'],
+        )
+
+    for term in terms:
+        queryset = queryset.filter(Q(title__icontains=term) | Q(description__icontains=term))
+    return queryset.order_by('-created_at', '-id')
@@ -1,16 +1,43 @@
 from rest_framework import serializers
 from apps.orders.models import Orders, Category, OrderImage
+from apps.users.models import UserRegion
+from apps.utils import validate_image_pixels
 
 
 class OrderImageSerializer(serializers.ModelSerializer):
     class Meta:
         model = OrderImage
         fields = ['id', 'image']
+        extra_kwargs = {
+            'image': {'validators': [validate_image_pixels]},
+        }
 
 
-class OrderSerializer(serializers.ModelSerializer):
+class SparseFieldsetMixin:
+    """
+    Оставляет в выдаче только поля из context['fields'] (их выбирает SparseFieldsetViewMixin
+    по ?fields= / ?expand=). Без выбора — default_fields, а если они None — все поля.
+    """
+    default_fields = None
+
+    @classmethod
+    def available_fields(cls):
+        fields = cls(context={'fields': None}).fields
+        return [name for name, field in fields.items() if not field.write_only]
+
+    def get_fields(self):
+        fields = super().get_fields()
+        selected = self.context.get('fields', self.default_fields)
+        if selected is not None:
+            for name in set(fields) - set(selected):
+                fields.pop(name)
+        return fields
+
+
+class OrderSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     images = OrderImageSerializer(many=True, write_only=True, required=False)
     image_urls = serializers.SerializerMethodField(read_only=True)
+    image_srcset = serializers.SerializerMethodField(read_only=True)
 
     class Meta:
         model = Orders
@@ -18,13 +45,50 @@ class OrderSerializer(serializers.ModelSerializer):
             'id', 'title', 'description', 'created_at', 'created_by',
             'executor', 'is_taken', 'is_paid', 'region', 'type_orders',
             'price_for_executor', 'budget', 'deadline', 'contact_phone',
-            'latitude', 'longitude', 'images', 'image_urls'
+            'latitude', 'longitude', 'images', 'image_urls', 'image_srcset'
         ]
-        read_only_fields = ['created_by', 'executor', 'is_taken', 'image_urls']
+        read_only_fields = ['created_by', 'executor', 'is_taken', 'image_urls', 'image_srcset']
+        # PositiveIntegerField проверяется только CHECK-ограничением БД — ловим до INSERT
+        extra_kwargs = {
+            'budget': {'min_value': 0},
+            'price_for_executor': {'min_value': 0},
+        }
 
     def get_image_urls(self, obj):
         request = self.context.get('request')
-        return [request.build_absolute_uri(image.image.url) for image in obj.images.all()] if request else []
+        if not request:
+            return []
+        return [self.build_absolute_url(image.image.url) for image in obj.images.all()]
+
+    def get_image_srcset(self, obj):
+        """
+        Для каждого фото — словарь {ширина: url} готовых webp-копий,
+        чтобы лента могла грузить маленькие превью. Пусто, пока фото не сконвертировано.
+        """
+        request = self.context.get('request')
+        if not request:
+            return []
+        return [
+            {
+                size: self.build_absolute_url(image.image.storage.url(rendition['name']))
+                for size, rendition in image.renditions.items()
+            }
+            for image in obj.images.all()
+        ]
+
+    def build_absolute_url(self, url):
+        """
+        Абсолютный URL без вызова build_absolute_uri на каждое фото:
+        базовый адрес считается один раз на весь ответ и хранится на корневом сериализаторе.
+        """
+        if not url.startswith('/'):
+            return url
+        root = self.root
+        base_url = getattr(root, '_base_url', None)
+        if base_url is None:
+            base_url = self.context['request'].build_absolute_uri('/').rstrip('/')
+            root._base_url = base_url
+        return base_url + url
 
     def validate_images(self, value):
         if len(value) > 5:
@@ -41,6 +105,83 @@ class OrderSerializer(serializers.ModelSerializer):
 
         return order
 
+class OrderListSerializer(OrderSerializer):
+    """
+    Компактная карточка заказа для лент: заголовок, бюджет, превью и пара атрибутов.
+    Остальные поля OrderSerializer доступны через ?expand= или ?fields=.
+    """
+    thumbnail = serializers.SerializerMethodField(read_only=True)
+
+    default_fields = [
+        'id', 'title', 'budget', 'price_for_executor', 'deadline', 'created_at',
+        'region', 'type_orders', 'is_taken', 'is_paid', 'thumbnail',
+    ]
+
+    class Meta(OrderSerializer.Meta):
+        fields = OrderSerializer.Meta.fields + ['thumbnail']
+        read_only_fields = OrderSerializer.Meta.read_only_fields + ['thumbnail']
+
+    def get_thumbnail(self, obj):
+        """Самая маленькая webp-копия первого фото, до конвертации — само фото."""
+        request = self.context.get('request')
+        images = obj.images.all()
+        if not request or not images:
+            return None
+        image = images[0]
+        if image.renditions:
+            smallest = min(image.renditions, key=int)
+            return self.build_absolute_url(image.image.storage.url(image.renditions[smallest]['name']))
+        return self.build_absolute_url(image.image.url)
+
+
+class PrefetchedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    PK-поле для пакетной валидации: объекты берутся из context['prefetched'][имя поля],
+    загруженного одним запросом на весь пакет, а не запросом на каждый элемент.
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            pk = int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        obj = self.context['prefetched'][self.field_name].get(pk)
+        if obj is None:
+            self.fail('does_not_exist', pk_value=data)
+        return obj
+
+
+class BulkOrderItemSerializer(OrderSerializer):
+    """
+    Один заказ из пакетного создания: те же поля и проверки, что у OrderSerializer,
+    но связи проверяются по заранее загруженным регионам и категориям.
+    """
+    region = PrefetchedPrimaryKeyRelatedField(queryset=UserRegion.objects.all(), required=False, allow_null=True)
+    type_orders = PrefetchedPrimaryKeyRelatedField(queryset=Category.objects.all(), required=False, allow_null=True)
+
+
+class NearbyOrdersQuerySerializer(serializers.Serializer):
+    latitude = serializers.FloatField(min_value=-90, max_value=90)
+    longitude = serializers.FloatField(min_value=-180, max_value=180)
+    radius = serializers.FloatField(min_value=0.1, max_value=100, default=10, help_text='Радиус поиска, км')
+    limit = serializers.IntegerField(min_value=1, max_value=200, default=50)
+
+
+class OrderSearchQuerySerializer(serializers.Serializer):
+    q = serializers.CharField(max_length=200, help_text='Поисковый запрос')
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=20)
+
+
+def active_children(category):
+    """
+    Активные дочерние категории. После get_cached_trees() get_children()
+    берёт детей из кэша узла, без запроса к БД.
+    """
+    return [child for child in category.get_children() if child.is_active]
+
+
 class RecursiveCategorySerializer(serializers.Serializer):
     id = serializers.IntegerField()
     title = serializers.CharField()
@@ -48,8 +189,7 @@ class RecursiveCategorySerializer(serializers.Serializer):
 
     def get_children(self, obj):
         if hasattr(obj, 'children'):
-            children = obj.children.all()
-            return RecursiveCategorySerializer(children, many=True).data
+            return RecursiveCategorySerializer(active_children(obj), many=True).data
         return []
 
 
@@ -61,4 +201,4 @@ class CategorySerializer(serializers.ModelSerializer):
         fields = ['id', 'title', 'slug', 'parent', 'children']
 
     def get_children(self, obj):
-        return RecursiveCategorySerializer(obj.children.all(), many=True).data
+        return RecursiveCategorySerializer(active_children(obj), many=True).data
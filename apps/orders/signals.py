@@ -0,0 +1,56 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from mptt.signals import node_moved
+
+from apps.orders import search
+from apps.orders.cache import invalidate_category_tree, invalidate_executor_feed
+from apps.orders.models import Category, Orders, OrderImage
+
+
+@receiver(post_save, sender=Orders)
+def index_order_for_search(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not {'title', 'description'} & set(update_fields):
+        return
+    search.index_order(instance)
+
+
+@receiver(post_delete, sender=Orders)
+def remove_order_from_search(sender, instance, **kwargs):
+    search.remove_order(instance.pk)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(node_moved, sender=Category)
+def reset_category_tree_cache(sender, **kwargs):
+    # Сбрасываем после коммита, чтобы параллельный запрос не закэшировал старое дерево
+    transaction.on_commit(invalidate_category_tree)
+
+
+@receiver(pre_save, sender=Orders)
+def remember_order_region(sender, instance, update_fields=None, **kwargs):
+    # При переносе заказа в другой регион сбрасывать нужно и ленту старого региона
+    if instance.pk and (update_fields is None or 'region' in update_fields):
+        instance._previous_region_id = (
+            Orders.objects.filter(pk=instance.pk).values_list('region_id', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Orders)
+@receiver(post_delete, sender=Orders)
+def reset_executor_feed_cache(sender, instance, **kwargs):
+    region_ids = {instance.region_id, getattr(instance, '_previous_region_id', None)} - {None}
+    for region_id in region_ids:
+        transaction.on_commit(lambda region_id=region_id: invalidate_executor_feed(region_id))
+
+
+@receiver(post_save, sender=OrderImage)
+@receiver(post_delete, sender=OrderImage)
+def reset_order_caches_for_image(sender, instance, **kwargs):
+    # Фото входят в выдачу заказа: меняем его updated_at (ETag) и сбрасываем ленту региона
+    orders = Orders.objects.filter(pk=instance.order_id)
+    orders.touch()
+    region_id = orders.values_list('region_id', flat=True).first()
+    if region_id is not None:
+        transaction.on_commit(lambda: invalidate_executor_feed(region_id))
@@ -0,0 +1,42 @@
+from celery import shared_task
+
+from apps.orders.cache import invalidate_executor_feed
+from apps.utils import convert_image_to_webp_renditions
+
+
+@shared_task
+def convert_order_image_task(image_id):
+    """
+    Конвертирует загруженное фото заказа в набор webp-копий за одно декодирование.
+    До окончания конвертации заказ отдаёт исходный файл, после — webp.
+    """
+    from apps.orders.models import OrderImage, Orders
+
+    order_image = OrderImage.objects.filter(id=image_id).first()
+    if order_image is None or not order_image.image or order_image.image.name.endswith('.webp'):
+        return
+
+    original_name = order_image.image.name
+    storage = order_image.image.storage
+    converted = convert_image_to_webp_renditions(
+        order_image.image, OrderImage.RENDITION_SIZES, upload_to='order_images/'
+    )
+
+    renditions = {}
+    for size, (filename, content, (width, height)) in converted.items():
+        name = storage.save(filename, content)
+        renditions[str(size)] = {'name': name, 'width': width, 'height': height}
+    main_name = renditions[str(max(OrderImage.RENDITION_SIZES))]['name']
+
+    # Обновляем только если фото не заменили, пока шла конвертация
+    updated = OrderImage.objects.filter(id=image_id, image=original_name).update(
+        image=main_name, renditions=renditions
+    )
+    if updated:
+        storage.delete(original_name)
+        Orders.objects.filter(pk=order_image.order_id).touch()
+        # update() не шлёт сигналов — ссылки на фото в ленте меняем сами
+        invalidate_executor_feed(order_image.order.region_id)
+    else:
+        for rendition in renditions.values():
+            storage.delete(rendition['name'])
@@ -1,3 +1,138 @@
-from django.test import TestCase
+from django.test import TestCase, TransactionTestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from apps.orders.models import Orders
+from apps.users import balance
+from apps.users.models import User, BalanceTransaction
+from apps.users.tests import LOCMEM_CACHES, run_concurrently
+
+
+def create_order(customer, **kwargs):
+    kwargs.setdefault('price_for_executor', 50)
+    return Orders.objects.create(
+        title='Ремонт крыши', description='Описание', created_by=customer,
+        budget=1000, contact_phone='0700000000', **kwargs
+    )
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class PayOrderTests(TestCase):
+    def setUp(self):
+        self.customer = User.objects.create_user('customer', 'customer@example.com', 'password', role='заказчик')
+        self.executor = User.objects.create_user('executor', 'executor@example.com', 'password', role='исполнитель')
+        self.order = create_order(self.customer)
+        self.client = APIClient()
+        self.client.force_authenticate(self.executor)
+
+    def pay(self, order=None):
+        return self.client.post(f'/api/v1/orders/orders/{(order or self.order).pk}/pay/')
+
+    def executor_balance(self):
+        return User.objects.values_list('executor_balance', flat=True).get(pk=self.executor.pk)
+
+    def test_pay_debits_price_and_records_ledger_entry(self):
+        balance.top_up(self.executor.pk, 120)
+
+        response = self.pay()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['remaining_balance'], 70)
+        self.assertEqual(self.executor_balance(), 70)
+        self.assertTrue(Orders.objects.get(pk=self.order.pk).is_paid)
+        entry = BalanceTransaction.objects.get(kind=BalanceTransaction.DEBIT)
+        self.assertEqual((entry.user_id, entry.order_id, entry.amount), (self.executor.pk, self.order.pk, -50))
+        self.assertEqual(balance.find_balance_mismatches(), [])
+
+    def test_repeated_pay_does_not_debit_twice(self):
+        balance.top_up(self.executor.pk, 120)
+
+        self.assertEqual(self.pay().status_code, status.HTTP_200_OK)
+        self.assertEqual(self.pay().status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.assertEqual(self.executor_balance(), 70)
+        self.assertEqual(BalanceTransaction.objects.filter(kind=BalanceTransaction.DEBIT).count(), 1)
+        self.assertEqual(balance.find_balance_mismatches(), [])
+
+    def test_insufficient_balance_returns_402_and_keeps_order_unpaid(self):
+        balance.top_up(self.executor.pk, 30)
+
+        response = self.pay()
+
+        self.assertEqual(response.status_code, status.HTTP_402_PAYMENT_REQUIRED)
+        self.assertEqual(response.data['your_balance'], 30)
+        self.assertFalse(Orders.objects.get(pk=self.order.pk).is_paid)
+        self.assertFalse(BalanceTransaction.objects.filter(kind=BalanceTransaction.DEBIT).exists())
+        self.assertEqual(balance.find_balance_mismatches(), [])
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class TakeOrderTests(TestCase):
+    def setUp(self):
+        self.customer = User.objects.create_user('customer', 'customer@example.com', 'password', role='заказчик')
+        self.executor = User.objects.create_user('executor', 'executor@example.com', 'password', role='исполнитель')
+        self.rival = User.objects.create_user('rival', 'rival@example.com', 'password', role='исполнитель')
+        self.client = APIClient()
+        self.client.force_authenticate(self.executor)
+
+    def take(self, order_id):
+        return self.client.post(f'/api/v1/orders/orders/{order_id}/take/')
+
+    def test_claim_succeeds_once(self):
+        order = create_order(self.customer, is_paid=True)
+
+        self.assertTrue(Orders.objects.claim(order.pk, self.executor))
+        self.assertFalse(Orders.objects.claim(order.pk, self.rival))
+        self.assertFalse(Orders.objects.claim(order.pk, self.executor))
+
+        order.refresh_from_db()
+        self.assertTrue(order.is_taken)
+        self.assertEqual(order.executor_id, self.executor.pk)
+
+    def test_take_returns_contact_phone(self):
+        order = create_order(self.customer, is_paid=True)
+
+        response = self.take(order.pk)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn(order.contact_phone, response.data['detail'])
+
+    def test_take_missing_order_returns_404(self):
+        self.assertEqual(self.take(0).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_take_already_taken_order_returns_400(self):
+        order = create_order(self.customer, is_paid=True)
+        Orders.objects.claim(order.pk, self.rival)
+
+        response = self.take(order.pk)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Orders.objects.get(pk=order.pk).executor_id, self.rival.pk)
+
+    def test_take_unpaid_order_returns_402(self):
+        order = create_order(self.customer)
+
+        response = self.take(order.pk)
+
+        self.assertEqual(response.status_code, status.HTTP_402_PAYMENT_REQUIRED)
+        self.assertFalse(Orders.objects.get(pk=order.pk).is_taken)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ConcurrentClaimTests(TransactionTestCase):
+    def test_exactly_one_of_parallel_claimers_wins(self):
+        customer = User.objects.create_user('customer', 'customer@example.com', 'password', role='заказчик')
+        executors = [
+            User.objects.create_user(f'executor{i}', f'executor{i}@example.com', 'password', role='исполнитель')
+            for i in range(8)
+        ]
+        order = create_order(customer, is_paid=True)
+
+        def claim(index):
+            executor = executors[index]
+            return executor.pk if Orders.objects.claim(order.pk, executor) else None
+
+        winners = [pk for pk in run_concurrently(len(executors), claim) if pk is not None]
+
+        self.assertEqual(len(winners), 1)
+        self.assertEqual(Orders.objects.get(pk=order.pk).executor_id, winners[0])
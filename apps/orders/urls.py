@@ -4,7 +4,9 @@ from .views import (
     CustomerOrderViewSet,
     ExecutorOrderListViewSet,
     TakeOrderViewSet,
-    OrderDetailAPI
+    OrderDetailAPI,
+    CategoryTreeAPI,
+    ExecutorFeedCacheStatsAPI
 )
 
 router = DefaultRouter()
@@ -22,5 +24,9 @@ router.register(r'orders', TakeOrderViewSet, basename='orders-actions')
 router.register(r'orders/detail', OrderDetailAPI, basename='order-detail')
 
 urlpatterns = [
+    # Дерево категорий (кэшируется, поддерживает ETag)
+    path('categories/tree/', CategoryTreeAPI.as_view(), name='category-tree'),
+    # Статистика кэша ленты исполнителей (только для администраторов)
+    path('executor/feed-cache/stats/', ExecutorFeedCacheStatsAPI.as_view(), name='executor-feed-cache-stats'),
     path('', include(router.urls)),
 ]
@@ -1,38 +1,248 @@
+import json
+
 from rest_framework import viewsets, mixins, status
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser, SAFE_METHODS
 from rest_framework.response import Response
+from rest_framework.exceptions import ValidationError
 from rest_framework.decorators import action
+from rest_framework.views import APIView
 from django.db import transaction
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
 
-from apps.orders.models import Orders
-from apps.orders.serializers import OrderSerializer
+from apps.orders import bulk, search
+from apps.orders.cache import (
+    get_category_tree, get_executor_feed_page, get_executor_feed_stats, invalidate_executor_feed,
+)
+from apps.orders.geo import haversine_km
+from apps.orders.models import Orders, Category
+from apps.orders.pagination import OrderCursorPagination
+from apps.orders.serializers import (
+    OrderSerializer, OrderListSerializer, NearbyOrdersQuerySerializer, OrderSearchQuerySerializer,
+)
+from apps.users import balance
+from apps.users.cache import get_subregion
 from apps.users.permissions import IsCustomerPermission, IsExecutorPermission
+from apps.utils import make_etag
+
+# Во сколько раз больше limit кандидатов nearby берёт из базы для точной сортировки
+NEARBY_CANDIDATES_FACTOR = 4
+
+
+class CategoryFilterMixin:
+    """
+    Фильтр ?category=<id>: заказы категории вместе со всеми подкатегориями.
+    """
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        category_id = self.request.query_params.get('category')
+        if not category_id:
+            return queryset
+        if not category_id.isdigit():
+            raise ValidationError({"category": "Некорректный ID категории."})
+
+        category = Category.objects.filter(pk=category_id).only('tree_id', 'lft', 'rght').first()
+        if category is None:
+            return queryset.none()
+        return queryset.in_category(category)
+
+
+class SparseFieldsetViewMixin:
+    """
+    ?fields=a,b — отдать только эти поля, ?expand=c,d — добавить их к полям по умолчанию.
+    Выбор сужает и выдачу сериализатора, и SELECT (only()), а фото
+    подгружаются, только если запрошено поле с фото.
+    Списки по умолчанию отдают компактную карточку OrderListSerializer.
+    """
+    list_actions = ('list',)
+    image_fields = {'image_urls', 'image_srcset', 'thumbnail'}
+
+    def get_serializer_class(self):
+        if self.action in self.list_actions:
+            return OrderListSerializer
+        return super().get_serializer_class()
+
+    def get_requested_fields(self):
+        """Выбранные поля или None, если параметров нет. Считается один раз на запрос."""
+        if hasattr(self, '_requested_fields'):
+            return self._requested_fields
 
+        params = self.request.query_params
+        fields = [name for name in params.get('fields', '').split(',') if name]
+        expand = [name for name in params.get('expand', '').split(',') if name]
+        selected = None
+        if fields or expand:
+            serializer_class = self.get_serializer_class()
+            available = serializer_class.available_fields()
+            unknown = [name for name in fields + expand if name not in available]
+            if unknown:
+                raise ValidationError({"fields": f"Неизвестные поля: {', '.join(unknown)}."})
+            selected = fields or list(serializer_class.default_fields or available) + expand
+            selected = ['id'] + [name for name in dict.fromkeys(selected) if name != 'id']
 
-class CustomerOrderViewSet(viewsets.ModelViewSet):
+        self._requested_fields = selected
+        return selected
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        # Запись всегда идёт полным сериализатором
+        if self.request.method in SAFE_METHODS and self.get_requested_fields() is not None:
+            context['fields'] = self.get_requested_fields()
+        return context
+
+    def trim_queryset(self, queryset):
+        if self.request.method not in SAFE_METHODS:
+            return queryset
+
+        serializer_class = self.get_serializer_class()
+        fields = self.get_requested_fields() or serializer_class.default_fields or serializer_class.available_fields()
+        model_fields = {field.name for field in Orders._meta.concrete_fields}
+        # created_at и id нужны курсорной пагинации
+        columns = {'id', 'created_at'} | {name for name in fields if name in model_fields}
+
+        queryset = queryset.select_related(None).prefetch_related(None).only(*columns)
+        if self.image_fields & set(fields):
+            queryset = queryset.prefetch_related('images')
+        return queryset
+
+
+class CustomerOrderViewSet(SparseFieldsetViewMixin, CategoryFilterMixin, viewsets.ModelViewSet):
     """
     Заказчик может создавать и просматривать свои заказы.
     """
     serializer_class = OrderSerializer
     permission_classes = [IsAuthenticated, IsCustomerPermission]
+    pagination_class = OrderCursorPagination
 
     def get_queryset(self):
-        return Orders.objects.filter(created_by=self.request.user)
+        return self.trim_queryset(Orders.objects.filter(created_by=self.request.user).with_related())
 
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
 
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk_create(self, request):
+        """
+        Создание пачки заказов за несколько запросов к БД.
+
+        JSON: список заказов. multipart: поле orders — JSON-список,
+        фото заказа с индексом i — файлы в поле images_<i>.
+        Ответ: созданные заказы и ошибки по индексам; ошибочные элементы
+        не мешают создать остальные (207, если есть и те и другие).
+        """
+        items = request.data
+        if not isinstance(items, list):
+            try:
+                items = json.loads(request.data.get('orders', ''))
+            except (TypeError, ValueError):
+                raise ValidationError({"orders": "Ожидался JSON-список заказов."})
+            if not isinstance(items, list):
+                raise ValidationError({"orders": "Ожидался JSON-список заказов."})
+            for index, item in enumerate(items):
+                files = request.FILES.getlist(f'images_{index}')
+                if files and isinstance(item, dict):
+                    item['images'] = [{'image': file} for file in files]
+
+        if not items:
+            raise ValidationError({"orders": "Список заказов пуст."})
+        if len(items) > bulk.MAX_BULK_ORDERS:
+            raise ValidationError({"orders": f"Не более {bulk.MAX_BULK_ORDERS} заказов за один запрос."})
+
+        created, errors = bulk.create_orders(items, request.user, self.get_serializer_context())
+        if not created:
+            response_status = status.HTTP_400_BAD_REQUEST
+        elif errors:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_201_CREATED
+        return Response({
+            "created": [{"index": index, "id": order.pk} for index, order in created],
+            "errors": [{"index": index, "errors": item_errors} for index, item_errors in errors],
+        }, status=response_status)
 
-class ExecutorOrderListViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
+
+class ExecutorOrderListViewSet(SparseFieldsetViewMixin, CategoryFilterMixin, mixins.ListModelMixin, viewsets.GenericViewSet):
     """
     Исполнитель видит заказы по своему региону, которые ещё не заняты.
     """
     serializer_class = OrderSerializer
+    list_actions = ('list', 'nearby', 'search_orders')
     permission_classes = [IsAuthenticated, IsExecutorPermission]
+    pagination_class = OrderCursorPagination
+
+    def get_region_id(self):
+        # У пользователя нет собственного поля region — регион берём из подрегиона
+        # по справочнику в памяти: пользователь из кэша приходит без связанных объектов
+        subregion = get_subregion(self.request.user.subregion_id)
+        return subregion.region_id if subregion else None
 
     def get_queryset(self):
-        user_region = self.request.user.region
-        return Orders.objects.filter(is_taken=False, region=user_region)
+        return self.trim_queryset(Orders.objects.filter(is_taken=False, region_id=self.get_region_id()).with_related())
+
+    def list(self, request, *args, **kwargs):
+        """
+        Лента региона одинакова для всех его исполнителей, поэтому страницы
+        кэшируются в Redis и сбрасываются при любом изменении заказов региона.
+        С фильтром по категории лента собирается из базы как обычно.
+        """
+        region_id = self.get_region_id()
+        if region_id is None or 'category' in request.query_params:
+            return super().list(request, *args, **kwargs)
+
+        data = get_executor_feed_page(
+            region_id, request, lambda: super(ExecutorOrderListViewSet, self).list(request, *args, **kwargs).data
+        )
+        return Response(data)
+
+    @action(detail=False, methods=['get'], url_path='nearby')
+    def nearby(self, request):
+        """
+        Открытые заказы в радиусе radius км от точки, ближайшие первыми.
+        """
+        params = NearbyOrdersQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        latitude = params.validated_data['latitude']
+        longitude = params.validated_data['longitude']
+        radius = params.validated_data['radius']
+        limit = params.validated_data['limit']
+
+        # Кандидатов ограничиваем в SQL по приближённому расстоянию — с запасом,
+        # чтобы точная сортировка по haversine_km не потеряла ближайших
+        candidates = (
+            Orders.objects.filter(is_taken=False)
+            .within_bounding_box(latitude, longitude, radius)
+            .order_by_approx_distance(latitude, longitude)
+            .values_list('id', 'latitude', 'longitude')[:limit * NEARBY_CANDIDATES_FACTOR]
+        )
+        located = [(haversine_km(latitude, longitude, lat, lon), pk) for pk, lat, lon in candidates]
+        located = sorted(item for item in located if item[0] <= radius)[:limit]
+
+        # Между двумя запросами заказ могут взять или удалить — такие пропускаем
+        orders = self.trim_queryset(Orders.objects.filter(is_taken=False)).in_bulk([pk for _, pk in located])
+        data = []
+        for distance, pk in located:
+            order = orders.get(pk)
+            if order is None:
+                continue
+            item = self.get_serializer(order).data
+            item['distance_km'] = round(distance, 2)
+            data.append(item)
+        return Response(data)
+
+    @action(detail=False, methods=['get'], url_path='search')
+    def search_orders(self, request):
+        """
+        Полнотекстовый поиск по заголовку и описанию открытых заказов региона,
+        самые релевантные первыми.
+        """
+        params = OrderSearchQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        orders = search.search(queryset, params.validated_data['q'])[:params.validated_data['limit']]
+        return Response(self.get_serializer(orders, many=True).data)
 
 
 class TakeOrderViewSet(viewsets.GenericViewSet):
@@ -51,48 +261,102 @@ class TakeOrderViewSet(viewsets.GenericViewSet):
         if order.is_paid:
             return Response({"detail": "Заказ уже оплачен."}, status=status.HTTP_400_BAD_REQUEST)
 
-        if user.executor_balance < order.price_for_executor:
+        try:
+            with transaction.atomic():
+                # Оплату помечаем условным UPDATE: из двух одновременных оплат пройдёт одна
+                if not Orders.objects.filter(pk=order.pk, is_paid=False).update(is_paid=True, updated_at=timezone.now()):
+                    return Response({"detail": "Заказ уже оплачен."}, status=status.HTTP_400_BAD_REQUEST)
+                entry = balance.debit(
+                    user.pk, order.price_for_executor, order=order, comment=f"Оплата заказа #{order.pk}"
+                )
+                # update() не шлёт сигналов — ленту региона сбрасываем сами
+                transaction.on_commit(lambda: invalidate_executor_feed(order.region_id))
+        except balance.InsufficientBalanceError:
+            user.refresh_from_db(fields=['executor_balance'])
             return Response({
                 "detail": "Недостаточно средств. Пополните баланс минимум на 50 сомов.",
                 "your_balance": user.executor_balance
             }, status=status.HTTP_402_PAYMENT_REQUIRED)
 
-        user.executor_balance -= order.price_for_executor
-        user.save()
-
-        order.is_paid = True
-        order.save()
-
         return Response({
             "detail": f"С вашего баланса списано {order.price_for_executor} сомов. Теперь вы можете принять заказ.",
-            "remaining_balance": user.executor_balance
+            "remaining_balance": entry.balance_after
         }, status=status.HTTP_200_OK)
 
     @action(detail=True, methods=['post'], url_path='take')
     def take_order(self, request, pk=None):
-        with transaction.atomic():
-            try:
-                order = Orders.objects.select_for_update().get(pk=pk)
-            except Orders.DoesNotExist:
-                return Response({"detail": "Заказ не найден."}, status=status.HTTP_404_NOT_FOUND)
+        if Orders.objects.claim(pk, request.user):
+            order = Orders.objects.only('region_id', 'contact_phone').get(pk=pk)
+            # update() не шлёт сигналов — ленту региона сбрасываем сами
+            transaction.on_commit(lambda: invalidate_executor_feed(order.region_id))
+            return Response({"detail": "Вы успешно приняли заказ. Контактный номер заказчика: " + order.contact_phone})
 
-            if order.is_taken:
-                return Response({"detail": "Этот заказ уже принят."}, status=status.HTTP_400_BAD_REQUEST)
+        # Не достался — по текущему состоянию объясняем почему
+        order = Orders.objects.filter(pk=pk).only('is_taken', 'is_paid').first()
+        if order is None:
+            return Response({"detail": "Заказ не найден."}, status=status.HTTP_404_NOT_FOUND)
 
-            if not order.is_paid:
-                return Response({"detail": "Сначала оплатите заказ."}, status=status.HTTP_402_PAYMENT_REQUIRED)
+        if order.is_taken:
+            return Response({"detail": "Этот заказ уже принят."}, status=status.HTTP_400_BAD_REQUEST)
 
-            order.executor = request.user
-            order.is_taken = True
-            order.save()
+        return Response({"detail": "Сначала оплатите заказ."}, status=status.HTTP_402_PAYMENT_REQUIRED)
 
-            return Response({"detail": "Вы успешно приняли заказ. Контактный номер заказчика: " + order.contact_phone})
 
-
-class OrderDetailAPI(viewsets.GenericViewSet, mixins.RetrieveModelMixin):
+class OrderDetailAPI(SparseFieldsetViewMixin, viewsets.GenericViewSet, mixins.RetrieveModelMixin):
     """
     Получение подробной информации о заказе (например, для карты или модалки).
+    Полный OrderSerializer; ?fields= позволяет взять только нужные поля.
     """
     serializer_class = OrderSerializer
-    queryset = Orders.objects.all()
+    queryset = Orders.objects.with_related()
     permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return self.trim_queryset(super().get_queryset())
+
+    def retrieve(self, request, *args, **kwargs):
+        """
+        ETag берётся из updated_at одним запросом по первичному ключу.
+        Если клиент прислал актуальный If-None-Match — 304 без сериализации.
+        Last-Modified не отдаётся: он с точностью до секунды, и правка в ту же
+        секунду, что и прошлый запрос, выглядела бы для If-Modified-Since неизменной.
+        """
+        pk = str(kwargs['pk'])
+        updated_at = pk.isdigit() and Orders.objects.filter(pk=pk).values_list('updated_at', flat=True).first()
+        if not updated_at:
+            return super().retrieve(request, *args, **kwargs)
+
+        # Выдача зависит от хоста (абсолютные ссылки на фото) и ?fields=
+        etag = make_etag(pk, updated_at.isoformat(), request.get_host(), request.GET.urlencode())
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = super().retrieve(request, *args, **kwargs)
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+
+class CategoryTreeAPI(APIView):
+    """
+    Дерево активных категорий. Отдаётся готовым JSON из кэша с ETag,
+    при совпадении If-None-Match — 304 без тела.
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request, *args, **kwargs):
+        etag, content = get_category_tree()
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = HttpResponse(content, content_type='application/json')
+        response['ETag'] = etag
+        return response
+
+
+class ExecutorFeedCacheStatsAPI(APIView):
+    """
+    Попадания и промахи кэша ленты исполнителей — для мониторинга.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return Response(get_executor_feed_stats())
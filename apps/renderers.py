@@ -0,0 +1,66 @@
+"""
+Быстрые JSON-рендерер и парсер для DRF на orjson.
+
+Выдача совпадает с rest_framework.renderers.JSONRenderer: компактный UTF-8,
+datetime в ISO 8601 с «Z» для UTC, Decimal — числом, ленивые строки
+и прочие типы — через тот же rest_framework.utils.encoders.JSONEncoder.
+Отличие одно: NaN/Infinity orjson пишет как null, а не отклоняет.
+Целые вне 64 бит orjson не умеет — такие ответы рендерит JSONRenderer.
+
+Если orjson не установлен или клиент просит отступы (?format=json; indent=4,
+Browsable API), работают стандартные классы DRF.
+"""
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    options = orjson and (orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+    def __init__(self):
+        self._default = encoders.JSONEncoder().default
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=self._default, option=self.options)
+        except TypeError:
+            # orjson не пишет целые вне 64 бит и не передаёт их в default —
+            # такой ответ отдаём стандартным рендерером DRF
+            return super().render(data, accepted_media_type, renderer_context)
+        # Как и DRF, экранируем U+2028/U+2029, чтобы ответ был подмножеством JavaScript
+        if b'\xe2\x80' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+class FastJSONParser(JSONParser):
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None:
+            return super().parse(stream, media_type, parser_context)
+
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        try:
+            content = stream.read()
+            if encoding.lower().replace('-', '') != 'utf8':
+                content = content.decode(encoding)
+            return orjson.loads(content)
+        except (ValueError, UnicodeDecodeError) as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
@@ -1,5 +1,7 @@
-from django.contrib import admin
-from apps.users.models import User, UserRegion, UserSubRegion
+from django import forms
+from django.contrib import admin, messages
+from apps.users import balance
+from apps.users.models import User, UserRegion, UserSubRegion, PassportPhotoFingerprint, BalanceTransaction
 
 
 @admin.register(UserRegion)
@@ -11,23 +13,38 @@ class UserRegionAdmin(admin.ModelAdmin):
 @admin.register(UserSubRegion)
 class UserSubRegionAdmin(admin.ModelAdmin):
     list_display = ['id', 'title', 'region']
+    list_select_related = ['region']
     list_filter = ['region']
     search_fields = ['title', 'region__title']
 
 
+class SubRegionListFilter(admin.RelatedFieldListFilter):
+    # Название подрегиона включает регион — подгружаем их одним запросом
+    def field_choices(self, field, request, model_admin):
+        return [
+            (subregion.pk, str(subregion))
+            for subregion in UserSubRegion.objects.select_related('region')
+        ]
+
+
 @admin.register(User)
 class UserAdmin(admin.ModelAdmin):
     list_display = [
         "username", "first_name", "last_name", "email", "phone", "role",
         "get_region", "get_subregion", "is_active", "is_verified"
     ]
+    # Подрегион и регион строк списка приходят тем же запросом
+    list_select_related = ["subregion__region"]
     list_filter = [
-        "role", "is_active", "is_verified", "subregion__region", "subregion"
+        "role", "is_active", "is_verified", "subregion__region", ("subregion", SubRegionListFilter)
     ]
     search_fields = [
         "username", "first_name", "last_name", "email", "phone",
         "subregion__title", "subregion__region__title"
     ]
+    # Баланс меняется только операциями журнала (см. «Операции по балансу»)
+    readonly_fields = ["executor_balance"]
+    actions = ["deactivate_users"]
 
     def get_region(self, obj):
         if obj.subregion and obj.subregion.region:
@@ -38,3 +55,65 @@ class UserAdmin(admin.ModelAdmin):
     def get_subregion(self, obj):
         return obj.subregion.title if obj.subregion else "-"
     get_subregion.short_description = "Подрегион (район)"
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name == "subregion":
+            kwargs["queryset"] = UserSubRegion.objects.select_related("region")
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+    def has_delete_permission(self, request, obj=None):
+        # Журнал баланса защищает пользователя от удаления — такого можно только деактивировать
+        if obj is not None and obj.balance_transactions.exists():
+            return False
+        return super().has_delete_permission(request, obj)
+
+    @admin.action(description="Деактивировать выбранных пользователей")
+    def deactivate_users(self, request, queryset):
+        # По одному, а не update(): сохранение сбрасывает кэш аутентификации
+        users = list(queryset.filter(is_active=True))
+        for user in users:
+            user.is_active = False
+            user.save(update_fields=["is_active"])
+        self.message_user(request, f"Деактивировано пользователей: {len(users)}", messages.SUCCESS)
+
+
+@admin.register(PassportPhotoFingerprint)
+class PassportPhotoFingerprintAdmin(admin.ModelAdmin):
+    list_display = ['id', 'user', 'label', 'confidence', 'reused_from', 'created_at']
+    list_filter = ['label', ('reused_from', admin.EmptyFieldListFilter)]
+    search_fields = ['sha256', 'user__username', 'reused_from__username']
+    raw_id_fields = ['user', 'reused_from']
+
+
+class BalanceTopUpForm(forms.ModelForm):
+    class Meta:
+        model = BalanceTransaction
+        fields = ['user', 'amount', 'comment']
+
+    def clean_amount(self):
+        amount = self.cleaned_data['amount']
+        if amount <= 0:
+            raise forms.ValidationError("Сумма пополнения должна быть положительной.")
+        return amount
+
+
+@admin.register(BalanceTransaction)
+class BalanceTransactionAdmin(admin.ModelAdmin):
+    """
+    Журнал только добавляется: новая запись в админке — пополнение баланса.
+    """
+    form = BalanceTopUpForm
+    list_display = ['id', 'user', 'kind', 'amount', 'balance_after', 'order', 'created_at']
+    list_filter = ['kind']
+    search_fields = ['user__username', 'user__email', 'comment']
+    raw_id_fields = ['user']
+
+    def save_model(self, request, obj, form, change):
+        entry = balance.top_up(obj.user_id, obj.amount, comment=obj.comment)
+        obj.pk, obj.kind, obj.balance_after = entry.pk, entry.kind, entry.balance_after
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -4,4 +4,7 @@ from django.apps import AppConfig
 class UsersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.users'
-    verbose_name="Пользователи"
\ No newline at end of file
+    verbose_name="Пользователи"
+
+    def ready(self):
+        from apps.users import signals  # noqa: F401
@@ -0,0 +1,33 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from apps.users.cache import get_cached_user
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication, который берёт пользователя из кэша (L1 процесса + Redis)
+    по user_id и версии. Версия меняется при User.save, удалении пользователя
+    и изменении баланса, поэтому роль и баланс всегда актуальны.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        # Промах кэша — обычная загрузка со всеми проверками simplejwt
+        user = get_cached_user(user_id, lambda: super(CachedJWTAuthentication, self).get_user(validated_token))
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        return user
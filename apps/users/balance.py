@@ -0,0 +1,66 @@
+from django.db import transaction
+from django.db.models import F, Sum
+
+from apps.users.cache import invalidate_user
+from apps.users.models import BalanceTransaction, User
+
+
+class InsufficientBalanceError(Exception):
+    pass
+
+
+def _apply(user_id, amount, kind, order=None, comment=''):
+    """
+    Меняет баланс одним UPDATE без чтения строки в Python и пишет запись в журнал
+    в той же транзакции. Для списания условие executor_balance >= x проверяет сама база,
+    поэтому параллельные списания не теряются и не уводят баланс в минус.
+    """
+    users = User.objects.filter(pk=user_id)
+    if amount < 0:
+        users = users.filter(executor_balance__gte=-amount)
+
+    with transaction.atomic():
+        if not users.update(executor_balance=F('executor_balance') + amount):
+            raise InsufficientBalanceError(user_id)
+        # Строка уже заблокирована нашим UPDATE — остаток читается согласованно
+        balance = User.objects.filter(pk=user_id).values_list('executor_balance', flat=True).get()
+        # update() не шлёт сигналов — кэш аутентификации сбрасываем сами
+        transaction.on_commit(lambda: invalidate_user(user_id))
+        return BalanceTransaction.objects.create(
+            user_id=user_id,
+            kind=kind,
+            amount=amount,
+            balance_after=balance,
+            order=order,
+            comment=comment,
+        )
+
+
+def debit(user_id, amount, order=None, comment=''):
+    """Списание; InsufficientBalanceError, если средств не хватает."""
+    if amount <= 0:
+        raise ValueError("Сумма списания должна быть положительной.")
+    return _apply(user_id, -amount, BalanceTransaction.DEBIT, order, comment)
+
+
+def top_up(user_id, amount, comment=''):
+    if amount <= 0:
+        raise ValueError("Сумма пополнения должна быть положительной.")
+    return _apply(user_id, amount, BalanceTransaction.TOPUP, comment=comment)
+
+
+def find_balance_mismatches():
+    """
+    Сверка с журналом: [(user_id, баланс, сумма по журналу)] для расходящихся пользователей.
+    """
+    ledger = dict(
+        BalanceTransaction.objects.values('user_id').annotate(total=Sum('amount')).values_list('user_id', 'total')
+    )
+    balances = dict(
+        User.objects.filter(executor_balance__gt=0).values_list('id', 'executor_balance')
+    )
+    return [
+        (user_id, balances.get(user_id, 0), ledger.get(user_id, 0))
+        for user_id in sorted(set(ledger) | set(balances))
+        if balances.get(user_id, 0) != ledger.get(user_id, 0)
+    ]
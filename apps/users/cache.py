@@ -0,0 +1,125 @@
+import pickle
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+AUTH_USER_PREFIX = 'users:auth'
+REGIONS_VERSION_KEY = 'users:regions:version'
+
+# L1: user_id -> (версия, срок годности, pickle пользователя) — в памяти процесса
+_local_users = {}
+
+
+def _version_key(user_id):
+    return f'{AUTH_USER_PREFIX}:version:{user_id}'
+
+
+def get_user_version(user_id):
+    # Начальная версия от времени: если ключ вытеснят, старые записи не оживут
+    return cache.get_or_set(_version_key(user_id), time.time_ns(), timeout=None)
+
+
+def invalidate_user(user_id):
+    """
+    Новая версия пользователя в Redis: записи во всех процессах
+    (L1 и Redis) перестают совпадать по версии и больше не отдаются.
+    """
+    _local_users.pop(user_id, None)
+    try:
+        cache.incr(_version_key(user_id))
+    except ValueError:
+        cache.set(_version_key(user_id), time.time_ns(), timeout=None)
+
+
+def get_cached_user(user_id, load):
+    """
+    Пользователь для аутентификации: L1 процесса, затем Redis, затем load() из БД.
+    Версию каждый запрос сверяет с Redis — это один GET вместо запроса к БД,
+    и изменённая роль или баланс не отдаются из кэша.
+    Каждый вызов возвращает свою копию: запрос может менять request.user.
+    """
+    version = get_user_version(user_id)
+
+    local = _local_users.get(user_id)
+    if local and local[0] == version and local[1] > time.monotonic():
+        return pickle.loads(local[2])
+
+    key = f'{AUTH_USER_PREFIX}:{user_id}:{version}'
+    data = cache.get(key)
+    if data is None:
+        user = load()
+        data = pickle.dumps(user, pickle.HIGHEST_PROTOCOL)
+        cache.set(key, data, timeout=settings.AUTH_USER_CACHE_TIMEOUT)
+    else:
+        user = pickle.loads(data)
+
+    if len(_local_users) >= settings.AUTH_USER_CACHE_L1_SIZE:
+        _local_users.clear()
+    _local_users[user_id] = (version, time.monotonic() + settings.AUTH_USER_CACHE_L1_TIMEOUT, data)
+    return user
+
+
+class _RegionsSnapshot:
+    """Неизменяемый снимок справочника регионов одной версии."""
+
+    def __init__(self, version):
+        from apps.users.models import UserRegion, UserSubRegion
+
+        self.version = version
+        self.regions = UserRegion.objects.in_bulk()
+        self.subregions = UserSubRegion.objects.in_bulk()
+        for subregion in self.subregions.values():
+            # Регион берётся из снимка — subregion.region не ходит в БД
+            subregion.region = self.regions[subregion.region_id]
+
+        children = {}
+        for subregion in sorted(self.subregions.values(), key=lambda item: item.title):
+            children.setdefault(subregion.region_id, []).append({'id': subregion.id, 'title': subregion.title})
+        self.data = [
+            {'id': region.id, 'title': region.title, 'subregions': children.get(region.id, [])}
+            for region in sorted(self.regions.values(), key=lambda item: item.title)
+        ]
+
+
+_regions_snapshot = None
+_regions_checked_at = 0.0
+
+
+def get_regions_snapshot():
+    """
+    Справочник регионов и подрегионов в памяти процесса. Версию в Redis сверяем
+    не чаще раза в REGIONS_CACHE_CHECK_INTERVAL секунд, при расхождении
+    перечитываем обе таблицы (два запроса).
+    """
+    global _regions_snapshot, _regions_checked_at
+
+    now = time.monotonic()
+    snapshot = _regions_snapshot
+    if snapshot is not None and now - _regions_checked_at < settings.REGIONS_CACHE_CHECK_INTERVAL:
+        return snapshot
+
+    version = cache.get_or_set(REGIONS_VERSION_KEY, time.time_ns(), timeout=None)
+    if snapshot is None or snapshot.version != version:
+        snapshot = _RegionsSnapshot(version)
+        _regions_snapshot = snapshot
+    _regions_checked_at = now
+    return snapshot
+
+
+def get_region(region_id):
+    return get_regions_snapshot().regions.get(region_id)
+
+
+def get_subregion(subregion_id):
+    return get_regions_snapshot().subregions.get(subregion_id)
+
+
+def invalidate_regions():
+    """Сбрасывает снимок в этом процессе и меняет версию для остальных."""
+    global _regions_snapshot
+    _regions_snapshot = None
+    try:
+        cache.incr(REGIONS_VERSION_KEY)
+    except ValueError:
+        cache.set(REGIONS_VERSION_KEY, time.time_ns(), timeout=None)
@@ -0,0 +1,105 @@
+import statistics
+import threading
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection
+
+from apps.users import balance
+from apps.users.models import BalanceTransaction, User
+from apps.utils import throwaway_database
+
+
+def _legacy_debit(user_id, amount):
+    # Прежний путь pay_order: прочитать, вычесть в Python, сохранить
+    user = User.objects.get(pk=user_id)
+    if user.executor_balance < amount:
+        return False
+    user.executor_balance -= amount
+    user.save(update_fields=['executor_balance'])
+    return True
+
+
+def _ledger_debit(user_id, amount):
+    try:
+        balance.debit(user_id, amount, comment='benchmark')
+    except balance.InsufficientBalanceError:
+        return False
+    return True
+
+
+METHODS = {
+    'legacy': _legacy_debit,
+    'ledger': _ledger_debit,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Параллельные списания с одного баланса: прежнее чтение-изменение-запись "
+        "против условного UPDATE с журналом. Проверяет итоговый баланс и журнал, "
+        "показывает пропускную способность. Журнал не допускает удаления, поэтому "
+        "тест идёт во временной базе, которая создаётся и удаляется как при тестах."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--debits', type=int, default=50, help="Списаний на поток")
+        parser.add_argument('--amount', type=int, default=50)
+        parser.add_argument('--balance', type=int, default=None,
+                            help="Начальный баланс; по умолчанию хватает на половину списаний")
+
+    def run(self, method, options):
+        total = options['threads'] * options['debits']
+        initial = options['balance'] if options['balance'] is not None else total // 2 * options['amount']
+        user = User.objects.create(username=f'bench-{uuid.uuid4().hex[:12]}', email=f'{uuid.uuid4().hex}@bench.local')
+        balance.top_up(user.pk, initial, comment='benchmark')
+
+        succeeded, errors, timings = [], [], []
+        lock = threading.Lock()
+
+        def worker():
+            local_ok, local_errors, local_timings = 0, 0, []
+            try:
+                for _ in range(options['debits']):
+                    started = time.perf_counter()
+                    try:
+                        local_ok += METHODS[method](user.pk, options['amount'])
+                    except OperationalError:
+                        local_errors += 1
+                    local_timings.append(time.perf_counter() - started)
+            finally:
+                connection.close()
+            with lock:
+                succeeded.append(local_ok)
+                errors.append(local_errors)
+                timings.extend(local_timings)
+
+        threads = [threading.Thread(target=worker) for _ in range(options['threads'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        final = User.objects.values_list('executor_balance', flat=True).get(pk=user.pk)
+        expected = initial - sum(succeeded) * options['amount']
+        ledger_total = sum(BalanceTransaction.objects.filter(user=user).values_list('amount', flat=True))
+        timings.sort()
+
+        self.stdout.write(
+            f"{method:<7} {total / elapsed:8.1f} оп/с | p50 {statistics.median(timings) * 1000:6.1f} ms"
+            f"  p99 {timings[int(len(timings) * 0.99) - 1] * 1000:6.1f} ms | успешных {sum(succeeded)}"
+            f", ошибок БД {sum(errors)} | баланс {final}, ожидался {expected}, по журналу {ledger_total}"
+        )
+        correct = final == expected and final >= 0
+        if method == 'ledger':
+            correct = correct and final == ledger_total
+        self.stdout.write(self.style.SUCCESS("  корректно") if correct else self.style.ERROR("  потерянные обновления"))
+
+    def handle(self, *args, **options):
+        with throwaway_database():
+            for method in METHODS:
+                self.run(method, options)
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.users.balance import find_balance_mismatches
+
+
+class Command(BaseCommand):
+    help = "Сверяет балансы исполнителей с журналом операций по балансу."
+
+    def handle(self, *args, **options):
+        mismatches = find_balance_mismatches()
+        for user_id, user_balance, ledger_total in mismatches:
+            self.stdout.write(self.style.ERROR(
+                f"Пользователь {user_id}: баланс {user_balance}, по журналу {ledger_total}"
+            ))
+        if mismatches:
+            raise CommandError(f"Расхождений: {len(mismatches)}")
+        self.stdout.write(self.style.SUCCESS("Балансы сходятся с журналом."))
@@ -0,0 +1,41 @@
+# Generated by Django 4.2 on 2026-10-18 14:47
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PassportPhotoFingerprint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(db_index=True, max_length=64, verbose_name='SHA-256 файла')),
+                ('dhash', models.BigIntegerField(verbose_name='dHash')),
+                ('dhash_band0', models.PositiveSmallIntegerField(db_index=True)),
+                ('dhash_band1', models.PositiveSmallIntegerField(db_index=True)),
+                ('dhash_band2', models.PositiveSmallIntegerField(db_index=True)),
+                ('dhash_band3', models.PositiveSmallIntegerField(db_index=True)),
+                ('dhash_band4', models.PositiveSmallIntegerField(db_index=True)),
+                ('dhash_band5', models.PositiveSmallIntegerField(db_index=True)),
+                ('dhash_band6', models.PositiveSmallIntegerField(db_index=True)),
+                ('dhash_band7', models.PositiveSmallIntegerField(db_index=True)),
+                ('label', models.CharField(blank=True, max_length=16, null=True, verbose_name='Класс')),
+                ('confidence', models.FloatField(blank=True, null=True, verbose_name='Уверенность')),
+                ('model_version', models.CharField(max_length=64, verbose_name='Версия модели')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('reused_from', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Фото уже загружал пользователь')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='passport_fingerprints', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Отпечаток фото паспорта',
+                'verbose_name_plural': 'Отпечатки фото паспортов',
+            },
+        ),
+    ]
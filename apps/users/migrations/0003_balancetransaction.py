@@ -0,0 +1,54 @@
+# Generated by Django 4.2 on 2026-10-18 14:49
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def create_opening_balances(apps, schema_editor):
+    # Текущие балансы попадают в журнал начальными остатками, чтобы сверка сходилась
+    User = apps.get_model('users', 'User')
+    BalanceTransaction = apps.get_model('users', 'BalanceTransaction')
+    BalanceTransaction.objects.bulk_create([
+        BalanceTransaction(
+            user_id=user_id,
+            kind='opening',
+            amount=balance,
+            balance_after=balance,
+            comment='Остаток до ведения журнала',
+        )
+        for user_id, balance in User.objects.filter(executor_balance__gt=0).values_list('id', 'executor_balance')
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0007_orderimage_renditions'),
+        ('users', '0002_passportphotofingerprint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BalanceTransaction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('topup', 'Пополнение'), ('debit', 'Списание'), ('opening', 'Начальный остаток')], max_length=16, verbose_name='Тип операции')),
+                ('amount', models.IntegerField(help_text='Положительная — пополнение, отрицательная — списание', verbose_name='Сумма (сом)')),
+                ('balance_after', models.PositiveIntegerField(verbose_name='Баланс после операции')),
+                ('comment', models.CharField(blank=True, max_length=255, verbose_name='Комментарий')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('order', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='balance_transactions', to='orders.orders', verbose_name='Заказ')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='balance_transactions', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Операция по балансу',
+                'verbose_name_plural': 'Операции по балансу',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='balancetransaction',
+            index=models.Index(fields=['user', '-id'], name='balance_tx_user_idx'),
+        ),
+        migrations.RunPython(create_opening_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2 on 2026-10-18 15:08
+
+from django.db import migrations
+
+# Разбиение на момент миграции: 7 полос по 10, 9, 9, 9, 9, 9, 9 бит
+BAND_BITS = [10, 9, 9, 9, 9, 9, 9]
+
+
+def split_bands(apps, schema_editor):
+    # Полосы стали шире байта — пересчитываем их из сохранённого dHash
+    PassportPhotoFingerprint = apps.get_model('users', 'PassportPhotoFingerprint')
+    fingerprints = list(PassportPhotoFingerprint.objects.only('id', 'dhash'))
+    for fingerprint in fingerprints:
+        value = fingerprint.dhash & ((1 << 64) - 1)
+        for i, bits in enumerate(BAND_BITS):
+            setattr(fingerprint, f'dhash_band{i}', value & ((1 << bits) - 1))
+            value >>= bits
+    PassportPhotoFingerprint.objects.bulk_update(
+        fingerprints, [f'dhash_band{i}' for i in range(len(BAND_BITS))], batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_balancetransaction'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='passportphotofingerprint',
+            name='dhash_band7',
+        ),
+        migrations.RunPython(split_bands, migrations.RunPython.noop),
+    ]
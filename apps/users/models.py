@@ -83,6 +83,20 @@ class User(AbstractUser, PermissionsMixin):
     def __str__(self):
         return self.email
 
+    def delete_or_deactivate(self):
+        """
+        Удаляет пользователя. Если на него ссылается журнал баланса (PROTECT —
+        история денег не удаляется), пользователь только деактивируется.
+        Возвращает True, если пользователь удалён.
+        """
+        try:
+            self.delete()
+        except models.ProtectedError:
+            self.is_active = False
+            self.save(update_fields=['is_active'])
+            return False
+        return True
+
     def save(self, *args, **kwargs):
         super().save(*args, **kwargs)
 
@@ -108,3 +122,121 @@ class User(AbstractUser, PermissionsMixin):
 
     class Meta:
         verbose_name_plural = 'Пользователи'
+
+
+class PassportPhotoFingerprint(models.Model):
+    """
+    Отпечаток проверенного фото паспорта: хэш содержимого и перцептивный dHash.
+    Служит кэшем результата классификатора и индексом повторного использования фото.
+    dHash хранится также полосами (DHASH_BANDS = HASH_MAX_DISTANCE + 1 полос,
+    см. core.passport_classifier.fingerprints): у почти совпадающих изображений
+    хотя бы одна полоса совпадает точно, и кандидаты ищутся по индексам.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='passport_fingerprints',
+        verbose_name='Пользователь'
+    )
+    sha256 = models.CharField(max_length=64, db_index=True, verbose_name='SHA-256 файла')
+    dhash = models.BigIntegerField(verbose_name='dHash')
+    dhash_band0 = models.PositiveSmallIntegerField(db_index=True)
+    dhash_band1 = models.PositiveSmallIntegerField(db_index=True)
+    dhash_band2 = models.PositiveSmallIntegerField(db_index=True)
+    dhash_band3 = models.PositiveSmallIntegerField(db_index=True)
+    dhash_band4 = models.PositiveSmallIntegerField(db_index=True)
+    dhash_band5 = models.PositiveSmallIntegerField(db_index=True)
+    dhash_band6 = models.PositiveSmallIntegerField(db_index=True)
+    label = models.CharField(max_length=16, null=True, blank=True, verbose_name='Класс')
+    confidence = models.FloatField(null=True, blank=True, verbose_name='Уверенность')
+    model_version = models.CharField(max_length=64, verbose_name='Версия модели')
+    reused_from = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name='Фото уже загружал пользователь'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.sha256[:12]} — {self.label}"
+
+    class Meta:
+        verbose_name = 'Отпечаток фото паспорта'
+        verbose_name_plural = 'Отпечатки фото паспортов'
+
+
+class BalanceTransactionQuerySet(models.QuerySet):
+    """
+    Массовые delete()/update() обходят проверки save() и delete() модели,
+    поэтому для журнала они запрещены так же.
+    """
+    def delete(self):
+        raise ValueError("Записи журнала баланса не удаляются.")
+
+    delete.queryset_only = True
+
+    def update(self, **kwargs):
+        raise ValueError("Записи журнала баланса не изменяются — добавьте новую операцию.")
+
+
+class BalanceTransaction(models.Model):
+    """
+    Журнал движения баланса исполнителя: только добавление записей.
+    Сумма amount по пользователю всегда равна его executor_balance
+    (см. apps.users.balance и команду reconcile_balances).
+    """
+    TOPUP = 'topup'
+    DEBIT = 'debit'
+    OPENING = 'opening'
+    KIND = (
+        (TOPUP, 'Пополнение'),
+        (DEBIT, 'Списание'),
+        (OPENING, 'Начальный остаток'),
+    )
+
+    # Пользователя с операциями не удалить — см. User.delete_or_deactivate
+    user = models.ForeignKey(
+        User,
+        on_delete=models.PROTECT,
+        related_name='balance_transactions',
+        verbose_name='Пользователь'
+    )
+    kind = models.CharField(max_length=16, choices=KIND, verbose_name='Тип операции')
+    amount = models.IntegerField(verbose_name='Сумма (сом)', help_text='Положительная — пополнение, отрицательная — списание')
+    balance_after = models.PositiveIntegerField(verbose_name='Баланс после операции')
+    order = models.ForeignKey(
+        'orders.Orders',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='balance_transactions',
+        verbose_name='Заказ'
+    )
+    comment = models.CharField(max_length=255, blank=True, verbose_name='Комментарий')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = BalanceTransactionQuerySet.as_manager()
+
+    def __str__(self):
+        return f"{self.user} {self.amount:+d} сом"
+
+    def save(self, *args, **kwargs):
+        if self.pk is not None:
+            raise ValueError("Записи журнала баланса не изменяются — добавьте новую операцию.")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError("Записи журнала баланса не удаляются.")
+
+    class Meta:
+        verbose_name = 'Операция по балансу'
+        verbose_name_plural = 'Операции по балансу'
+        indexes = [
+            models.Index(fields=['user', '-id'], name='balance_tx_user_idx'),
+        ]
+
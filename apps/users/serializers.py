@@ -3,6 +3,8 @@ from .models import User, UserRegion, UserSubRegion
 import re, uuid
 from apps.users.utils import set_reset_code, send_reset_code
 from apps.users.utils import generate_code, get_reset_code, delete_reset_code
+from apps.users.cache import get_region, get_subregion
+from apps.utils import validate_image_pixels
 
 
 class UserRegionSerializer(serializers.ModelSerializer):
@@ -19,10 +21,32 @@ class UserSubRegionSerializer(serializers.ModelSerializer):
         fields = ['id', 'title', 'region']
 
 
+class CachedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    PK-поле справочника: объект ищется в кэше регионов (apps.users.cache), а не запросом.
+    """
+
+    def __init__(self, lookup, **kwargs):
+        self.lookup = lookup
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            pk = int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        obj = self.lookup(pk)
+        if obj is None:
+            self.fail('does_not_exist', pk_value=data)
+        return obj
+
+
 class UserSerializer(serializers.ModelSerializer):
     executor_balance = serializers.SerializerMethodField()
     region = UserRegionSerializer(read_only=True)
-    subregion = UserSubRegionSerializer(read_only=True)
+    subregion = serializers.SerializerMethodField()
 
     class Meta:
         model = User
@@ -37,6 +61,11 @@ class UserSerializer(serializers.ModelSerializer):
             'date_joined', 'is_active'
         ]
 
+    def get_subregion(self, obj):
+        # Подрегион с регионом — из справочника в памяти, без запроса
+        subregion = get_subregion(obj.subregion_id)
+        return UserSubRegionSerializer(subregion).data if subregion else None
+
     def get_executor_balance(self, obj):
         if obj.role == "исполнитель":
             return obj.executor_balance
@@ -46,14 +75,15 @@ class UserSerializer(serializers.ModelSerializer):
 
 class RegisterSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, min_length=8)
-    passport_photo_with_face = serializers.ImageField(required=False)
-    passport_front = serializers.ImageField(required=False)
-    passport_back = serializers.ImageField(required=False)
+    passport_photo_with_face = serializers.ImageField(required=False, validators=[validate_image_pixels])
+    passport_front = serializers.ImageField(required=False, validators=[validate_image_pixels])
+    passport_back = serializers.ImageField(required=False, validators=[validate_image_pixels])
     
     # Добавляем region только для валидации и передачи
-    region = serializers.PrimaryKeyRelatedField(
-        queryset=UserRegion.objects.all(), write_only=True
+    region = CachedPrimaryKeyRelatedField(
+        get_region, queryset=UserRegion.objects.all(), write_only=True
     )
+    subregion = CachedPrimaryKeyRelatedField(get_subregion, queryset=UserSubRegion.objects.all())
 
     class Meta:
         model = User
@@ -62,9 +92,6 @@ class RegisterSerializer(serializers.ModelSerializer):
             "phone", "role", "passport_photo_with_face",
             "passport_front", "passport_back"
         ]
-        extra_kwargs = {
-            "subregion": {"required": True},
-        }
 
     def validate_phone(self, value):
         pattern = r'^\+996\d{9}$'
@@ -0,0 +1,23 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.users.cache import invalidate_regions, invalidate_user
+from apps.users.models import User, UserRegion, UserSubRegion
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def reset_auth_user_cache(sender, instance, **kwargs):
+    # Сразу и после коммита: параллельный запрос мог закэшировать строку до коммита
+    invalidate_user(instance.pk)
+    transaction.on_commit(lambda: invalidate_user(instance.pk))
+
+
+@receiver(post_save, sender=UserRegion)
+@receiver(post_delete, sender=UserRegion)
+@receiver(post_save, sender=UserSubRegion)
+@receiver(post_delete, sender=UserSubRegion)
+def reset_regions_cache(sender, **kwargs):
+    invalidate_regions()
+    transaction.on_commit(invalidate_regions)
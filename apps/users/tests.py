@@ -1,3 +1,178 @@
-from django.test import TestCase
+import os
+import tempfile
+import threading
+import time
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from PIL import Image
+from django.db import OperationalError, connection
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from apps.users import balance
+from apps.users.models import User, PassportPhotoFingerprint, BalanceTransaction
+
+# Тесты не требуют запущенного Redis
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class PassportFingerprintTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        rng = np.random.default_rng(0)
+        image = Image.fromarray((rng.random((30, 40, 3)) * 255).astype(np.uint8)).resize((640, 480))
+        self.original = self.path('original.png')
+        image.save(self.original)
+        # Пересжатая уменьшенная копия: другой SHA-256, близкий dHash
+        self.copy = self.path('copy.jpg')
+        image.resize((600, 450)).save(self.copy, quality=70)
+
+        self.first = User.objects.create_user('first', 'first@example.com', 'password')
+        self.second = User.objects.create_user('second', 'second@example.com', 'password')
+
+    def path(self, name):
+        return os.path.join(self.tmp.name, name)
+
+    def classify(self, items):
+        from core.passport_classifier import fingerprints
+
+        with mock.patch.object(
+            fingerprints, 'classify_passport_photos', side_effect=lambda paths: [('face', 0.9)] * len(paths)
+        ) as model:
+            results = fingerprints.classify_with_fingerprints(items)
+        return results, model
+
+    def test_copy_in_same_batch_is_flagged_and_classified_once(self):
+        results, model = self.classify([(self.original, self.first.pk), (self.copy, self.second.pk)])
+
+        self.assertEqual(results, [('face', 0.9), ('face', 0.9)])
+        model.assert_called_once_with([self.original])
+        copy = PassportPhotoFingerprint.objects.get(user=self.second)
+        self.assertEqual(copy.reused_from_id, self.first.pk)
+        self.assertIsNone(PassportPhotoFingerprint.objects.get(user=self.first).reused_from_id)
+
+    def test_copy_in_later_batch_reuses_stored_result(self):
+        self.classify([(self.original, self.first.pk)])
+        results, model = self.classify([(self.copy, self.second.pk)])
+
+        self.assertEqual(results, [('face', 0.9)])
+        model.assert_not_called()
+        self.assertEqual(PassportPhotoFingerprint.objects.get(user=self.second).reused_from_id, self.first.pk)
+
+    def test_same_user_resubmission_is_not_flagged(self):
+        self.classify([(self.original, self.first.pk), (self.copy, self.first.pk)])
+
+        self.assertFalse(PassportPhotoFingerprint.objects.filter(reused_from__isnull=False).exists())
+
+
+def run_concurrently(count, func):
+    """
+    Вызывает func(номер потока) в count потоках одновременно, у каждого своё соединение с БД.
+    SQLite в тестах блокирует таблицу целиком — заблокированный запрос повторяется.
+    """
+    barrier = threading.Barrier(count)
+    results, lock = [], threading.Lock()
+
+    def worker(index):
+        barrier.wait()
+        try:
+            while True:
+                try:
+                    result = func(index)
+                    break
+                except OperationalError:
+                    time.sleep(0.001)
+        finally:
+            connection.close()
+        with lock:
+            results.append(result)
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class BalanceTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('executor', 'executor@example.com', 'password', role='исполнитель')
+
+    def balance(self):
+        return User.objects.values_list('executor_balance', flat=True).get(pk=self.user.pk)
+
+    def test_top_up_and_debit_are_recorded_in_ledger(self):
+        balance.top_up(self.user.pk, 100)
+        entry = balance.debit(self.user.pk, 30, comment='test')
+
+        self.assertEqual(self.balance(), 70)
+        self.assertEqual(entry.kind, BalanceTransaction.DEBIT)
+        self.assertEqual(entry.amount, -30)
+        self.assertEqual(entry.balance_after, 70)
+        self.assertEqual(balance.find_balance_mismatches(), [])
+
+    def test_insufficient_balance_leaves_balance_and_ledger_untouched(self):
+        balance.top_up(self.user.pk, 20)
+
+        with self.assertRaises(balance.InsufficientBalanceError):
+            balance.debit(self.user.pk, 30)
+
+        self.assertEqual(self.balance(), 20)
+        self.assertEqual(self.user.balance_transactions.count(), 1)
+        self.assertEqual(balance.find_balance_mismatches(), [])
+
+    def test_non_positive_amounts_are_rejected(self):
+        with self.assertRaises(ValueError):
+            balance.debit(self.user.pk, 0)
+        with self.assertRaises(ValueError):
+            balance.top_up(self.user.pk, -5)
+
+    def test_direct_balance_change_is_reported_as_mismatch(self):
+        balance.top_up(self.user.pk, 100)
+        User.objects.filter(pk=self.user.pk).update(executor_balance=60)
+
+        self.assertEqual(balance.find_balance_mismatches(), [(self.user.pk, 60, 100)])
+
+    def test_ledger_is_append_only(self):
+        entry = balance.top_up(self.user.pk, 100)
+        entries = BalanceTransaction.objects.filter(pk=entry.pk)
+
+        with self.assertRaises(ValueError):
+            entry.save()
+        with self.assertRaises(ValueError):
+            entry.delete()
+        with self.assertRaises(ValueError):
+            entries.update(amount=0)
+        with self.assertRaises(ValueError):
+            entries.delete()
+        self.assertEqual(BalanceTransaction.objects.get(pk=entry.pk).amount, 100)
+
+    def test_protected_user_is_deactivated_instead_of_deleted(self):
+        balance.top_up(self.user.pk, 100)
+
+        self.assertFalse(self.user.delete_or_deactivate())
+        self.assertFalse(User.objects.get(pk=self.user.pk).is_active)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ConcurrentDebitTests(TransactionTestCase):
+    def test_parallel_debits_never_overdraw(self):
+        user = User.objects.create_user('executor', 'executor@example.com', 'password', role='исполнитель')
+        balance.top_up(user.pk, 50 * 5)
+
+        def debit(index):
+            try:
+                balance.debit(user.pk, 50)
+            except balance.InsufficientBalanceError:
+                return False
+            return True
+
+        results = run_concurrently(12, debit)
+
+        self.assertEqual(results.count(True), 5)
+        self.assertEqual(User.objects.values_list('executor_balance', flat=True).get(pk=user.pk), 0)
+        self.assertEqual(balance.find_balance_mismatches(), [])
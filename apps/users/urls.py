@@ -5,7 +5,8 @@ from apps.users.views import (
     ChangePasswordView,
     RequestResetPasswordView,
     ConfirmResetPasswordView,
-    UserDelete
+    UserDelete,
+    RegionListView
 )
 from rest_framework_simplejwt.views import TokenRefreshView, TokenObtainPairView
 
@@ -13,6 +14,7 @@ from rest_framework_simplejwt.views import TokenRefreshView, TokenObtainPairView
 urlpatterns = [
     path('register/', RegisterView.as_view(), name='register'),
     path('profile/', UserProfileView.as_view(), name='user-profile'),
+    path('regions/', RegionListView.as_view(), name='region-list'),
     path("delete", UserDelete.as_view(), name='user-delete'),
     path('change-password/', ChangePasswordView.as_view(), name='change-password'),
     path('request-reset-password/', RequestResetPasswordView.as_view(), name='request-reset-password'),
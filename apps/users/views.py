@@ -1,7 +1,10 @@
 from rest_framework import mixins, generics, status
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
+from django.utils.cache import get_conditional_response, patch_cache_control
+from apps.users.cache import get_regions_snapshot
 from apps.users.models import User
+from apps.utils import make_etag
 from apps.users.serializers import (
     UserSerializer,
     RegisterSerializer,
@@ -31,8 +34,30 @@ class UserProfileView(
     def get_object(self):
         return self.request.user
 
+    # Поля пользователя, от которых зависит выдача профиля
+    etag_fields = [
+        'id', 'email', 'phone', 'role', 'is_verified', 'replies_balance',
+        'executor_balance', 'subregion_id', 'date_joined', 'is_active',
+    ]
+
     def get(self, request, *args, **kwargs):
-        return self.retrieve(request, *args, **kwargs)
+        """
+        Пользователь уже загружен аутентификацией, подрегион и регион берутся
+        из справочника в памяти, поэтому ETag считается без запросов к БД;
+        при совпадении — 304 без сериализации.
+        """
+        user = request.user
+        etag = make_etag(
+            *(getattr(user, field) for field in self.etag_fields),
+            get_regions_snapshot().version,
+        )
+
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = self.retrieve(request, *args, **kwargs)
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
 
     def put(self, request, *args, **kwargs):
         return self.update(request, *args, **kwargs)
@@ -40,6 +65,22 @@ class UserProfileView(
     def patch(self, request, *args, **kwargs):
         return self.partial_update(request, *args, **kwargs)
 
+class RegionListView(generics.GenericAPIView):
+    """
+    Справочник регионов с подрегионами — из кэша в памяти, с ETag по версии справочника.
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request, *args, **kwargs):
+        snapshot = get_regions_snapshot()
+        etag = make_etag('regions', snapshot.version)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = Response(snapshot.data)
+        response['ETag'] = etag
+        return response
+
+
 class UserDelete(generics.GenericAPIView, mixins.DestroyModelMixin):
     queryset = User.objects.all()
     permission_classes = [IsAuthenticated]
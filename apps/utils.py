@@ -1,8 +1,133 @@
 from PIL import Image
 from io import BytesIO
+import hashlib
+import math
 import os
+import resource
+import tempfile
+import uuid
+from contextlib import contextmanager
+from django.core.exceptions import ValidationError
 from django.core.files.base import ContentFile
 
+# Больше этого числа пикселей не декодируем (защита от «decompression bomb»)
+MAX_IMAGE_PIXELS = 64_000_000
+
+# Запас при черновом декодировании JPEG, чтобы финальное уменьшение оставалось качественным
+DRAFT_REDUCING_GAP = 2.0
+
+
+class ImageTooLargeError(ValueError):
+    pass
+
+
+def peak_rss_kb():
+    """
+    Пиковый RSS текущего процесса, КБ. На Linux берётся VmHWM: ru_maxrss
+    переживает exec и в дочернем процессе может показывать пик родителя.
+    """
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+@contextmanager
+def throwaway_database():
+    """
+    Временная база для нагрузочных команд: создаётся и удаляется как при тестах,
+    рабочие данные и сигналы на них не затрагиваются. Для SQLite — файл,
+    а не база в памяти: потокам бенчмарка нужна общая база.
+    """
+    from django.db import connection
+
+    old_name = connection.settings_dict['NAME']
+    test_settings = connection.settings_dict['TEST']
+    old_test_name = test_settings.get('NAME')
+    if connection.vendor == 'sqlite' and not old_test_name:
+        test_settings['NAME'] = os.path.join(tempfile.gettempdir(), f'bench-{uuid.uuid4().hex[:12]}.sqlite3')
+
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        test_settings['NAME'] = old_test_name
+
+
+def make_etag(*parts):
+    """Сильный ETag из значений-валидаторов (версия, updated_at, параметры запроса)."""
+    return '"%s"' % hashlib.md5('|'.join(str(part) for part in parts).encode()).hexdigest()
+
+
+def check_image_pixels(image, max_pixels=MAX_IMAGE_PIXELS):
+    """
+    Проверяет размер по заголовку, не декодируя пиксели.
+    """
+    width, height = image.size
+    if width * height > max_pixels:
+        raise ImageTooLargeError(
+            f"Изображение слишком большое: {width}x{height}, допустимо не более {max_pixels} пикселей."
+        )
+
+
+def validate_image_pixels(image_file):
+    """
+    Валидатор для полей загрузки: отклоняет слишком большие изображения
+    по заголовку файла, до декодирования.
+    """
+    position = image_file.tell()
+    try:
+        image = Image.open(image_file)
+    except Exception:
+        # Битый файл отклонит сам ImageField
+        return
+    else:
+        try:
+            check_image_pixels(image)
+        except ImageTooLargeError as e:
+            raise ValidationError(str(e))
+    finally:
+        image_file.seek(position)
+
+
+def decode_image(image_file, size, keep_aspect=True, max_pixels=MAX_IMAGE_PIXELS):
+    """
+    Декодирует изображение сразу в размер, близкий к нужному, и возвращает RGB-картинку.
+
+    Размеры проверяются по заголовку до декодирования. Для JPEG используется draft():
+    декодер сам уменьшает картинку в 2/4/8 раз, и полноразмерный растр в памяти не создаётся.
+
+    :param image_file: файл или image field
+    :param size: tuple(width, height)
+    :param keep_aspect: True — вписать в size с сохранением пропорций (как thumbnail),
+                        False — привести ровно к size (как resize)
+    :param max_pixels: предел числа пикселей исходника
+    :return: PIL.Image в режиме RGB
+    """
+    img = Image.open(image_file)
+    check_image_pixels(img, max_pixels)
+
+    width, height = img.size
+    scales = (size[0] / width, size[1] / height)
+    scale = min(scales) if keep_aspect else max(scales)
+    if scale * DRAFT_REDUCING_GAP < 1:
+        img.draft('RGB', (
+            math.ceil(width * scale * DRAFT_REDUCING_GAP),
+            math.ceil(height * scale * DRAFT_REDUCING_GAP),
+        ))
+
+    img = img.convert("RGB")
+    if keep_aspect:
+        img.thumbnail(size)
+    elif img.size != tuple(size):
+        img = img.resize(size)
+    return img
+
 
 def convert_image_to_webp(image_field, upload_to='order/', quality=80, resize_to=None):
     """
@@ -14,11 +139,12 @@ def convert_image_to_webp(image_field, upload_to='order/', quality=80, resize_to
     :param resize_to: tuple(width, height), например (1024, 1024)
     :return: (filename, ContentFile)
     """
-    img = Image.open(image_field)
-    img = img.convert("RGB")
-
     if resize_to:
-        img.thumbnail(resize_to)
+        img = decode_image(image_field, resize_to)
+    else:
+        img = Image.open(image_field)
+        check_image_pixels(img)
+        img = img.convert("RGB")
 
     webp_io = BytesIO()
     img.save(webp_io, format='webp', quality=quality)
@@ -26,3 +152,29 @@ def convert_image_to_webp(image_field, upload_to='order/', quality=80, resize_to
     filename_base, _ = os.path.splitext(os.path.basename(image_field.name))
     webp_filename = f"{upload_to}{filename_base}.webp"
     return webp_filename, ContentFile(webp_io.getvalue())
+
+
+def convert_image_to_webp_renditions(image_field, sizes, upload_to='order/', quality=80):
+    """
+    Делает несколько webp-копий разных размеров за одно декодирование исходника:
+    каждая следующая копия уменьшается из предыдущей, а не из оригинала.
+
+    :param image_field: исходный image field (models.ImageField)
+    :param sizes: максимальные стороны копий, например (1024, 480, 160)
+    :param upload_to: путь для сохранения (папка внутри MEDIA_ROOT)
+    :param quality: качество webp (0-100)
+    :return: {size: (filename, ContentFile, (width, height))}
+    """
+    largest = max(sizes)
+    img = decode_image(image_field, (largest, largest))
+
+    filename_base, _ = os.path.splitext(os.path.basename(image_field.name))
+    renditions = {}
+    for size in sorted(sizes, reverse=True):
+        img.thumbnail((size, size))
+
+        webp_io = BytesIO()
+        img.save(webp_io, format='webp', quality=quality)
+        webp_filename = f"{upload_to}{filename_base}_{size}.webp"
+        renditions[size] = (webp_filename, ContentFile(webp_io.getvalue()), img.size)
+    return renditions
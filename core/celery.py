@@ -7,4 +7,10 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
 app = Celery('core')
 app.config_from_object('django.conf:settings', namespace='CELERY')
 app.autodiscover_tasks()
-import core.passport_classifier.tasks
\ No newline at end of file
+import core.passport_classifier.tasks
+import core.passport_classifier.worker
+
+# Классификация паспортов идёт в отдельной очереди ml, чтобы короткие задачи
+# не ждали модель, а модель не загружалась в обычных воркерах:
+#   celery -A core worker -Q celery -n default@%h
+#   celery -A core worker -Q ml -n ml@%h --concurrency=2 --prefetch-multiplier=1
\ No newline at end of file
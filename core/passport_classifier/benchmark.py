@@ -0,0 +1,171 @@
+"""
+Замер скорости и точности классификатора паспортов.
+
+    python -m core.passport_classifier.benchmark --backend keras --max-batch-size 8
+    python -m core.passport_classifier.benchmark --backend tflite --output bench_tflite.json
+    python -m core.passport_classifier.benchmark --model /path/to/passport_model_v2.keras
+
+Прогоняет изображения из dataset/{back,face,front} (или любой папки) с батчами
+1..N и сообщает img/s, p50/p95/p99 задержки, время загрузки модели и пиковый RSS.
+Для размеченных папок — матрица ошибок и точность по классам.
+Результат сохраняется в JSON для сравнения backend-ов, батчей и версий модели.
+"""
+import argparse
+import json
+import os
+import platform
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from apps.utils import peak_rss_kb
+from core.passport_classifier.utils import (
+    BACKENDS, DATASET_DIR, IMAGE_EXTENSIONS, class_indices, class_names, list_dataset,
+    model_path, preprocess_images, tflite_model_path,
+)
+
+DEFAULT_MODEL_PATHS = {
+    'keras': model_path,
+    'tflite': tflite_model_path,
+}
+
+
+def list_images(folder):
+    """Размеченный датасет, а если подпапок классов нет — все изображения папки без меток."""
+    samples = list_dataset(folder)
+    if samples:
+        return samples
+    return [
+        (os.path.join(root, filename), None)
+        for root, _, filenames in sorted(os.walk(folder))
+        for filename in sorted(filenames)
+        if filename.lower().endswith(IMAGE_EXTENSIONS)
+    ]
+
+
+def percentile_ms(values, q):
+    return round(float(np.percentile(values, q)) * 1000, 2)
+
+
+def run_batch_size(backend, paths, batch_size, repeat):
+    """
+    Задержка батча целиком (декодирование + модель) и отдельно модели.
+    Возвращает (метрики, предсказанные индексы классов).
+    """
+    total, model_only, predicted = [], [], []
+    # Новая форма входа может вызвать перетрассировку графа — прогреваем её отдельно
+    backend.predict(preprocess_images(paths[:batch_size])[0])
+    for run in range(repeat):
+        for i in range(0, len(paths), batch_size):
+            started = time.perf_counter()
+            batch, valid = preprocess_images(paths[i:i + batch_size])
+            inference_started = time.perf_counter()
+            predictions = backend.predict(batch)
+            finished = time.perf_counter()
+
+            total.append(finished - started)
+            model_only.append(finished - inference_started)
+            if run == 0:
+                labels = np.argmax(predictions, axis=1)
+                predicted.extend(int(label) if ok else None for label, ok in zip(labels, valid))
+
+    metrics = {
+        'images_per_sec': round(len(paths) * repeat / sum(total), 2),
+        'p50_ms': percentile_ms(total, 50),
+        'p95_ms': percentile_ms(total, 95),
+        'p99_ms': percentile_ms(total, 99),
+        'model_p50_ms': percentile_ms(model_only, 50),
+        'model_p95_ms': percentile_ms(model_only, 95),
+    }
+    return metrics, predicted
+
+
+def evaluate(expected, predicted):
+    labels = [class_names[i] for i in range(len(class_names))]
+    matrix = np.zeros((len(labels), len(labels)), dtype=int)
+    for label, prediction in zip(expected, predicted):
+        if label is not None and prediction is not None:
+            matrix[class_indices[label], prediction] += 1
+
+    per_class = {}
+    for index, label in enumerate(labels):
+        count = int(matrix[index].sum())
+        per_class[label] = {
+            'images': count,
+            'accuracy': round(float(matrix[index, index]) / count, 4) if count else None,
+        }
+    labeled = int(matrix.sum())
+    return {
+        'accuracy': round(float(np.trace(matrix)) / labeled, 4) if labeled else None,
+        'per_class': per_class,
+        'confusion_matrix': {'labels': labels, 'rows_expected_cols_predicted': matrix.tolist()},
+        'unreadable': sum(prediction is None for prediction in predicted),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк и оценка классификатора паспортов")
+    parser.add_argument('--dataset', default=DATASET_DIR)
+    parser.add_argument('--backend', choices=sorted(BACKENDS), default='keras')
+    parser.add_argument('--model', default=None, help="Файл модели; по умолчанию модель выбранного backend-а")
+    parser.add_argument('--max-batch-size', type=int, default=8)
+    parser.add_argument('--repeat', type=int, default=3, help="Проходов по датасету на каждый размер батча")
+    parser.add_argument('--output', default=None, help="JSON с результатами (по умолчанию benchmark_<backend>_<время>.json)")
+    args = parser.parse_args()
+
+    samples = list_images(args.dataset)
+    if not samples:
+        parser.error(f"в {args.dataset} нет изображений")
+    paths = [path for path, _ in samples]
+    expected = [label for _, label in samples]
+    model_file = args.model or DEFAULT_MODEL_PATHS[args.backend]
+
+    rss_before = peak_rss_kb()
+    started = time.perf_counter()
+    backend = BACKENDS[args.backend](model_file)
+    load_time = time.perf_counter() - started
+
+    batches, predicted = {}, None
+    for batch_size in range(1, args.max_batch_size + 1):
+        metrics, batch_predicted = run_batch_size(backend, paths, batch_size, args.repeat)
+        batches[str(batch_size)] = metrics
+        predicted = predicted or batch_predicted
+        print(
+            f"batch {batch_size:>3}: {metrics['images_per_sec']:8.1f} img/s | "
+            f"p50 {metrics['p50_ms']:8.1f} ms  p95 {metrics['p95_ms']:8.1f} ms  p99 {metrics['p99_ms']:8.1f} ms | "
+            f"модель p50 {metrics['model_p50_ms']:8.1f} ms"
+        )
+
+    result = {
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'host': {'platform': platform.platform(), 'cpu_count': os.cpu_count()},
+        'backend': args.backend,
+        'model': os.path.abspath(model_file),
+        'model_size_bytes': os.path.getsize(model_file),
+        'dataset': os.path.abspath(args.dataset),
+        'images': len(paths),
+        'load_time_s': round(load_time, 3),
+        'peak_rss_mb': round(peak_rss_kb() / 1024, 1),
+        'peak_rss_growth_mb': round((peak_rss_kb() - rss_before) / 1024, 1),
+        'batches': batches,
+        **evaluate(expected, predicted),
+    }
+
+    print(f"загрузка модели {result['load_time_s']} s, пиковый RSS {result['peak_rss_mb']} MB")
+    if result['accuracy'] is not None:
+        print(f"точность {result['accuracy']:.3f}")
+        for label, stats in result['per_class'].items():
+            print(f"  {label:<6} {stats['accuracy']} ({stats['images']} изобр.)")
+        print("матрица ошибок (строки — ожидаемый класс):", result['confusion_matrix']['labels'])
+        for label, row in zip(result['confusion_matrix']['labels'], result['confusion_matrix']['rows_expected_cols_predicted']):
+            print(f"  {label:<6} {row}")
+
+    output = args.output or f"benchmark_{args.backend}_{datetime.now():%Y%m%d_%H%M%S}.json"
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f"✅ Результаты сохранены: {output}")
+
+
+if __name__ == '__main__':
+    main()
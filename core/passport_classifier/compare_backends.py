@@ -0,0 +1,70 @@
+"""
+Сверка backend-ов классификатора паспортов: совпадение меток и задержка.
+
+    python -m core.passport_classifier.compare_backends --batch-size 3
+
+Завершается с кодом 1, если доля совпавших меток ниже --min-agreement.
+"""
+import argparse
+import statistics
+import sys
+import time
+
+from core.passport_classifier.utils import DATASET_DIR, classify_passport_photos, list_dataset, load_backend
+
+
+def run_backend(name, paths, batch_size):
+    started = time.perf_counter()
+    backend = load_backend(name)
+    load_time = time.perf_counter() - started
+
+    # Прогрев, чтобы первая партия не включала инициализацию графа
+    classify_passport_photos(paths[:batch_size], backend=backend)
+
+    labels, latencies = [], []
+    for i in range(0, len(paths), batch_size):
+        started = time.perf_counter()
+        results = classify_passport_photos(paths[i:i + batch_size], backend=backend)
+        latencies.append(time.perf_counter() - started)
+        labels.extend(result[0] if result else None for result in results)
+    return labels, latencies, load_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сравнение backend-ов классификатора паспортов")
+    parser.add_argument('--dataset', default=DATASET_DIR)
+    parser.add_argument('--backends', nargs='+', default=['keras', 'tflite'])
+    parser.add_argument('--batch-size', type=int, default=3)
+    parser.add_argument('--min-agreement', type=float, default=0.99)
+    args = parser.parse_args()
+
+    samples = list_dataset(args.dataset)
+    if not samples:
+        sys.exit(f"❌ В {args.dataset} нет изображений")
+    paths = [path for path, _ in samples]
+    expected = [label for _, label in samples]
+
+    predictions = {}
+    for name in args.backends:
+        labels, latencies, load_time = run_backend(name, paths, args.batch_size)
+        predictions[name] = labels
+        accuracy = sum(p == e for p, e in zip(labels, expected)) / len(expected)
+        print(
+            f"{name:<7} загрузка {load_time:6.2f} s | батч {args.batch_size}: "
+            f"p50 {statistics.median(latencies) * 1000:7.1f} ms, "
+            f"{len(paths) / sum(latencies):6.1f} img/s | точность {accuracy:.3f}"
+        )
+
+    reference, *others = args.backends
+    failed = False
+    for name in others:
+        agreement = sum(a == b for a, b in zip(predictions[reference], predictions[name])) / len(paths)
+        print(f"совпадение меток {reference} / {name}: {agreement:.3f}")
+        failed = failed or agreement < args.min_agreement
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""
+Экспорт passport_model.keras в квантованный TFLite.
+
+    python -m core.passport_classifier.export_tflite --quantization float16
+    python -m core.passport_classifier.export_tflite --quantization int8
+
+После экспорта проверьте совпадение меток: python -m core.passport_classifier.compare_backends
+"""
+import argparse
+import os
+import random
+
+import tensorflow as tf
+
+from core.passport_classifier.utils import DATASET_DIR, list_dataset, model_path, preprocess_images, tflite_model_path
+
+
+def representative_dataset(dataset_dir, limit=200):
+    """Калибровочные данные для int8 — те же изображения и та же предобработка, что в проде."""
+    samples = list_dataset(dataset_dir)
+    random.Random(0).shuffle(samples)
+    for path, _ in samples[:limit]:
+        batch, valid = preprocess_images([path])
+        if valid[0]:
+            yield [batch]
+
+
+def export(quantization, dataset_dir=DATASET_DIR, output=tflite_model_path):
+    model = tf.keras.models.load_model(model_path)
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+
+    if quantization == 'float16':
+        converter.target_spec.supported_types = [tf.float16]
+    elif quantization == 'int8':
+        # Веса и активации в int8, вход/выход остаются float32 — предобработка не меняется
+        converter.representative_dataset = lambda: representative_dataset(dataset_dir)
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+
+    tflite_model = converter.convert()
+    with open(output, 'wb') as f:
+        f.write(tflite_model)
+    return len(tflite_model)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Экспорт классификатора паспортов в TFLite")
+    parser.add_argument('--quantization', choices=['float16', 'int8', 'dynamic'], default='float16')
+    parser.add_argument('--dataset', default=DATASET_DIR, help="Папка с калибровочными изображениями для int8")
+    parser.add_argument('--output', default=tflite_model_path)
+    args = parser.parse_args()
+
+    size = export(args.quantization, args.dataset, args.output)
+    print(f"✅ {args.output}: {size / 1024 / 1024:.1f} MB ({args.quantization}, исходная модель {os.path.getsize(model_path) / 1024 / 1024:.1f} MB)")
+
+
+if __name__ == '__main__':
+    main()
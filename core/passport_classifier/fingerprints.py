@@ -0,0 +1,181 @@
+"""
+Кэш результатов классификатора по отпечаткам фото паспорта.
+
+Точное совпадение ищется по SHA-256 содержимого файла, почти совпадающее
+(пересжатие, небольшой ресайз) — по dHash с расстоянием Хэмминга
+не больше HASH_MAX_DISTANCE. Совпадение с фото другого пользователя
+отмечается в reused_from.
+"""
+import hashlib
+import os
+
+import numpy as np
+from django.db.models import Q
+
+from apps.utils import decode_image
+from core.passport_classifier.utils import classify_passport_photos, get_model_version
+
+DHASH_SIZE = 8
+DHASH_BITS = DHASH_SIZE * DHASH_SIZE
+HASH_MAX_DISTANCE = 6
+# 64 бита делятся на HASH_MAX_DISTANCE + 1 полос по 9–10 бит: при расстоянии
+# не больше HASH_MAX_DISTANCE хотя бы одна полоса совпадает точно. Полосы
+# шире байта, чтобы значение полосы отсекало кандидатов и на однотипных сканах.
+DHASH_BANDS = HASH_MAX_DISTANCE + 1
+DHASH_BAND_BITS = [
+    DHASH_BITS // DHASH_BANDS + (1 if i < DHASH_BITS % DHASH_BANDS else 0)
+    for i in range(DHASH_BANDS)
+]
+# Сколько почти совпадающих кандидатов максимум проверяется в Python
+MAX_CANDIDATES = 200
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def dhash(path):
+    """
+    Разностный хэш: картинка 9x8 в оттенках серого, бит = «левый пиксель ярче правого».
+    Возвращает 64-битное число со знаком (как хранит BigIntegerField).
+    """
+    img = decode_image(path, (DHASH_SIZE + 1, DHASH_SIZE), keep_aspect=False).convert('L')
+    pixels = np.asarray(img, dtype=np.int16)
+    bits = (pixels[:, :-1] > pixels[:, 1:]).flatten()
+    value = int(''.join('1' if bit else '0' for bit in bits), 2)
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def dhash_bands(value):
+    value &= (1 << DHASH_BITS) - 1
+    bands = []
+    for bits in DHASH_BAND_BITS:
+        bands.append(value & ((1 << bits) - 1))
+        value >>= bits
+    return bands
+
+
+def hamming_distance(a, b):
+    return bin((a ^ b) & ((1 << 64) - 1)).count('1')
+
+
+def fingerprint(path):
+    """(sha256, dhash) файла или None, если файл не читается как изображение."""
+    try:
+        return file_sha256(path), dhash(path)
+    except Exception as e:
+        print(f"❌ Не удалось посчитать отпечаток {path}: {e}")
+        return None
+
+
+def find_matches(sha256, hash_value):
+    """
+    Сохранённые отпечатки того же файла, затем почти того же изображения, новые первыми.
+    Точные совпадения идут раньше: у однотонных сканов dHash почти одинаков.
+    Кандидаты выбираются по индексам полос dHash (не больше MAX_CANDIDATES самых
+    новых), точное расстояние — в Python.
+    """
+    from apps.users.models import PassportPhotoFingerprint
+
+    exact = list(PassportPhotoFingerprint.objects.filter(sha256=sha256).order_by('-id'))
+
+    condition = Q()
+    for i, band in enumerate(dhash_bands(hash_value)):
+        condition |= Q(**{f'dhash_band{i}': band})
+    candidates = (
+        PassportPhotoFingerprint.objects
+        .filter(condition)
+        .exclude(sha256=sha256)
+        .order_by('-id')[:MAX_CANDIDATES]
+    )
+    similar = [match for match in candidates if hamming_distance(match.dhash, hash_value) <= HASH_MAX_DISTANCE]
+    return exact + similar
+
+
+def find_batch_matches(fingerprints, indices, sha256, hash_value):
+    """
+    Индексы элементов текущего батча с тем же файлом или почти тем же
+    изображением: их отпечатки ещё не сохранены, find_matches их не видит.
+    Точные совпадения первыми.
+    """
+    exact = [j for j in indices if fingerprints[j][0] == sha256]
+    similar = [
+        j for j in indices
+        if fingerprints[j][0] != sha256 and hamming_distance(fingerprints[j][1], hash_value) <= HASH_MAX_DISTANCE
+    ]
+    return exact + similar
+
+
+def classify_with_fingerprints(items):
+    """
+    Классифицирует фото паспортов, пропуская модель для уже виденных изображений —
+    и сохранённых ранее, и встретившихся раньше в этом же батче.
+
+    :param items: список (путь, user_id)
+    :return: для каждого файла (label, confidence) или None, как classify_passport_photos
+    """
+    from apps.users.models import PassportPhotoFingerprint, User
+
+    model_version = get_model_version()
+    results = [None] * len(items)
+    fingerprints = [None] * len(items)
+    reused_from = [None] * len(items)
+    # Повтор фото из этого же батча берёт результат первого вхождения
+    duplicate_of = {}
+    seen = []
+    to_classify = []
+
+    for index, (path, user_id) in enumerate(items):
+        fingerprints[index] = fingerprint(path)
+        if fingerprints[index] is None:
+            continue
+
+        matches = find_matches(*fingerprints[index])
+        batch_matches = find_batch_matches(fingerprints, seen, *fingerprints[index])
+        seen.append(index)
+
+        other_user = next(
+            (m.user_id for m in matches if m.user_id and m.user_id != user_id),
+            next((items[j][1] for j in batch_matches if items[j][1] != user_id), None),
+        )
+        if other_user:
+            reused_from[index] = other_user
+            print(f"⚠️ Фото паспорта пользователя {user_id} уже загружал пользователь {other_user}")
+
+        cached = next((m for m in matches if m.model_version == model_version and m.label), None)
+        if cached:
+            results[index] = (cached.label, cached.confidence)
+        elif batch_matches:
+            duplicate_of[index] = batch_matches[0]
+        else:
+            to_classify.append(index)
+
+    if to_classify:
+        classified = classify_passport_photos([items[index][0] for index in to_classify])
+        for index, result in zip(to_classify, classified):
+            results[index] = result
+    # Индексы по возрастанию: первое вхождение к этому моменту уже с результатом
+    for index, original in sorted(duplicate_of.items()):
+        results[index] = results[original]
+
+    # Пользователь мог быть удалён, пока проверка ждала в очереди
+    existing_users = set(User.objects.filter(id__in={user_id for _, user_id in items}).values_list('id', flat=True))
+    PassportPhotoFingerprint.objects.bulk_create([
+        PassportPhotoFingerprint(
+            user_id=user_id if user_id in existing_users else None,
+            sha256=fingerprints[index][0],
+            dhash=fingerprints[index][1],
+            **{f'dhash_band{i}': band for i, band in enumerate(dhash_bands(fingerprints[index][1]))},
+            label=results[index][0] if results[index] else None,
+            confidence=results[index][1] if results[index] else None,
+            model_version=model_version,
+            reused_from_id=reused_from[index],
+        )
+        for index, (path, user_id) in enumerate(items)
+        if fingerprints[index] is not None
+    ])
+    return results
@@ -1,18 +1,135 @@
+import json
+import time
+import uuid
+
 from celery import shared_task
-from core.passport_classifier.utils import predict_passport_photo
+from django.conf import settings
+from django_redis import get_redis_connection
+
+from core.passport_classifier.fingerprints import classify_with_fingerprints
+
+PENDING_KEY = 'passport_verification:pending'
+# Взятый в работу батч лежит в своём списке, пока каждый пользователь не обработан;
+# в BATCHES_KEY — время, когда батч был взят
+PROCESSING_KEY_PREFIX = 'passport_verification:processing:'
+BATCHES_KEY = 'passport_verification:batches'
+# Проверки, упавшие PASSPORT_VERIFICATION_MAX_ATTEMPTS раз, — для ручного разбора
+DEAD_KEY = 'passport_verification:dead'
+DOCUMENT_TYPES = ('face', 'front', 'back')
+
 
 @shared_task
 def validate_passport_images_task(user_id, photo_with_face_path, front_path, back_path):
+    """
+    Ставит проверку паспорта в очередь. Сама классификация выполняется
+    батчем по нескольким пользователям в process_passport_verifications_task.
+    """
+    redis = get_redis_connection('default')
+    redis.rpush(PENDING_KEY, json.dumps({
+        'user_id': user_id,
+        'paths': [photo_with_face_path, front_path, back_path],
+    }))
+    # Небольшое окно, чтобы в батч успели попасть соседние регистрации
+    process_passport_verifications_task.apply_async(countdown=settings.PASSPORT_BATCH_WINDOW)
+
+
+def _claim_batch(redis, limit):
+    """
+    Атомарно переносит до limit проверок из очереди в собственный список батча.
+    Повторная попытка берётся одна: упавший батч не тянет за собой соседей.
+    Возвращает (ключ списка, исходные элементы).
+    """
+    head = redis.lindex(PENDING_KEY, 0)
+    if head is not None and json.loads(head).get('attempts'):
+        limit = 1
+
+    processing_key = PROCESSING_KEY_PREFIX + uuid.uuid4().hex
+    # Батч регистрируется до переноса: если воркер упадёт, _requeue_stale его найдёт
+    redis.zadd(BATCHES_KEY, {processing_key: time.time()})
+    with redis.pipeline() as pipe:
+        for _ in range(limit):
+            pipe.lmove(PENDING_KEY, processing_key, 'LEFT', 'RIGHT')
+        items = [item for item in pipe.execute() if item is not None]
+    return processing_key, items
+
+
+def _requeue(redis, processing_key):
+    """
+    Возвращает необработанные проверки батча в начало очереди, сохраняя порядок,
+    и засчитывает им попытку. Исчерпавшие попытки уходят в DEAD_KEY.
+    """
+    def requeue(pipe):
+        items = [json.loads(item) for item in pipe.lrange(processing_key, 0, -1)]
+        pipe.multi()
+        for item in reversed(items):
+            item['attempts'] = item.get('attempts', 0) + 1
+            if item['attempts'] >= settings.PASSPORT_VERIFICATION_MAX_ATTEMPTS:
+                print(f"❌ Проверка паспорта пользователя {item['user_id']} не удалась {item['attempts']} раз, отложена")
+                pipe.rpush(DEAD_KEY, json.dumps(item))
+            else:
+                pipe.lpush(PENDING_KEY, json.dumps(item))
+        pipe.delete(processing_key)
+        pipe.zrem(BATCHES_KEY, processing_key)
+
+    # WATCH: батч не вернётся в очередь дважды, если его одновременно подберёт _requeue_stale
+    redis.transaction(requeue, processing_key)
+
+
+def _requeue_stale(redis):
+    """Возвращает в очередь батчи воркеров, упавших посреди обработки (OOM, SIGKILL)."""
+    deadline = time.time() - settings.PASSPORT_BATCH_STALE_TIMEOUT
+    for processing_key in redis.zrangebyscore(BATCHES_KEY, '-inf', deadline):
+        _requeue(redis, processing_key)
+
+
+@shared_task
+def process_passport_verifications_task():
+    """
+    Забирает накопившиеся проверки и классифицирует все документы одним проходом модели.
+    Несколько одновременно запущенных задач получают непересекающиеся части очереди.
+    Проверка снимается с очереди только после обработки пользователя: при ошибке
+    необработанные проверки возвращаются в очередь, а батч упавшего воркера — через
+    PASSPORT_BATCH_STALE_TIMEOUT при следующем запуске. Повторы идут по одной
+    проверке; после PASSPORT_VERIFICATION_MAX_ATTEMPTS неудач проверка уходит в DEAD_KEY.
+    """
     from apps.users.models import User
 
-    user = User.objects.get(id=user_id)
+    redis = get_redis_connection('default')
+    _requeue_stale(redis)
+    processing_key, raw_items = _claim_batch(redis, settings.PASSPORT_BATCH_MAX_USERS)
+    if not raw_items:
+        redis.zrem(BATCHES_KEY, processing_key)
+        return 0
+
+    pending = [json.loads(item) for item in raw_items]
+    try:
+        # Уже виденные фото берут результат из кэша отпечатков, остальные идут в модель одним батчем
+        results = classify_with_fingerprints([
+            (path, item['user_id']) for item in pending for path in item['paths']
+        ])
 
-    face_ok = predict_passport_photo(photo_with_face_path, expected_type='face')
-    front_ok = predict_passport_photo(front_path, expected_type='front')
-    back_ok = predict_passport_photo(back_path, expected_type='back')
+        users = User.objects.in_bulk([item['user_id'] for item in pending])
+        for i, item in enumerate(pending):
+            user = users.get(item['user_id'])
+            if user is not None:
+                documents = results[i * len(DOCUMENT_TYPES):(i + 1) * len(DOCUMENT_TYPES)]
+                is_valid = all(
+                    result is not None and result[0] == expected
+                    for result, expected in zip(documents, DOCUMENT_TYPES)
+                )
+                if is_valid:
+                    user.is_verified = True
+                    user.save(update_fields=['is_verified'])
+                else:
+                    user.delete_or_deactivate()
+            redis.lrem(processing_key, 1, raw_items[i])
+    except Exception:
+        _requeue(redis, processing_key)
+        process_passport_verifications_task.apply_async(countdown=settings.PASSPORT_BATCH_WINDOW)
+        raise
+    redis.zrem(BATCHES_KEY, processing_key)
 
-    if face_ok and front_ok and back_ok:
-        user.is_verified = True
-        user.save()
-    else:
-        user.delete()
+    # Если очередь пополнилась быстрее, чем разбиралась, продолжаем без ожидания
+    if redis.llen(PENDING_KEY):
+        process_passport_verifications_task.delay()
+    return len(pending)
@@ -1,43 +1,181 @@
-from PIL import Image
+import functools
 import numpy as np
 import tensorflow as tf
 import os
+from django.conf import settings
+from apps.utils import decode_image
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 model_path = os.path.join(BASE_DIR, "passport_model.keras")
-
-model = tf.keras.models.load_model(model_path)
+tflite_model_path = os.path.join(BASE_DIR, "passport_model.tflite")
+DATASET_DIR = os.path.join(os.path.dirname(os.path.dirname(BASE_DIR)), "dataset")
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp')
 
 class_indices = {'back': 0, 'face': 1, 'front': 2}
 class_names = {v: k for k, v in class_indices.items()}
 
-def predict_passport_photo(image_file, expected_type: str = None):
+IMAGE_SIZE = (224, 224)
+
+# Потоки на одну модель; выставляет configure_threads() в ML-воркере
+num_threads = None
+
+
+class KerasBackend:
+    def __init__(self, path=model_path):
+        self.model = tf.keras.models.load_model(path)
+
+    def predict(self, batch):
+        return np.asarray(self.model.predict_on_batch(batch))
+
+
+class TFLiteBackend:
+    """
+    Квантованная модель (см. export_tflite.py) через tf.lite.Interpreter.
+    Интерпретатор не потокобезопасен — один экземпляр на процесс.
+    """
+
+    def __init__(self, path=tflite_model_path):
+        self.interpreter = tf.lite.Interpreter(model_path=path, num_threads=num_threads)
+        self.batch_size = None
+
+    def _prepare(self, batch_size):
+        input_index = self.interpreter.get_input_details()[0]['index']
+        self.interpreter.resize_tensor_input(input_index, [batch_size, *IMAGE_SIZE, 3])
+        self.interpreter.allocate_tensors()
+        self.input = self.interpreter.get_input_details()[0]
+        self.output = self.interpreter.get_output_details()[0]
+        self.batch_size = batch_size
+
+    def predict(self, batch):
+        if batch.shape[0] != self.batch_size:
+            self._prepare(batch.shape[0])
+
+        # Для моделей с целочисленным входом/выходом — (де)квантование по параметрам тензора
+        scale, zero_point = self.input['quantization']
+        if self.input['dtype'] != np.float32:
+            batch = np.round(batch / scale + zero_point).astype(self.input['dtype'])
+        self.interpreter.set_tensor(self.input['index'], batch)
+        self.interpreter.invoke()
+
+        output = self.interpreter.get_tensor(self.output['index'])
+        scale, zero_point = self.output['quantization']
+        if self.output['dtype'] != np.float32:
+            output = (output.astype(np.float32) - zero_point) * scale
+        return output
+
+
+BACKENDS = {
+    'keras': KerasBackend,
+    'tflite': TFLiteBackend,
+}
+
+
+@functools.lru_cache(maxsize=None)
+def load_backend(name):
+    if name not in BACKENDS:
+        raise ValueError(f"Неизвестный backend классификатора: {name}")
+    return BACKENDS[name]()
+
+
+def get_backend():
+    """Модель загружается один раз на процесс, при первом обращении."""
+    return load_backend(settings.PASSPORT_CLASSIFIER_BACKEND)
+
+
+def get_model_version():
+    """
+    Версия модели для кэша результатов: backend и время изменения файла модели.
+    После переобучения старые результаты не переиспользуются.
+    """
+    name = settings.PASSPORT_CLASSIFIER_BACKEND
+    path = tflite_model_path if name == 'tflite' else model_path
     try:
-        img = Image.open(image_file)
-    except Exception as e:
-        print(f"❌ Ошибка при открытии изображения: {e}")
-        return False
+        return f"{name}:{int(os.path.getmtime(path))}"
+    except OSError:
+        return name
 
-    img = img.convert('RGB')
-    img = img.resize((224, 224))
 
-    img_array = np.array(img) / 255.0
-    if img_array.shape != (224, 224, 3):
-        print(f"❌ Неверная форма изображения: {img_array.shape}")
-        return False
+def configure_threads(threads):
+    """
+    Ограничивает потоки TensorFlow на процесс. Вызывать до загрузки модели
+    и до первой операции TF, иначе настройки уже не применятся.
+    """
+    global num_threads
+    num_threads = threads
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    # Граф MobileNetV2 последовательный — параллелизм между операциями не нужен
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+
+
+def warm_up(batch_size=3):
+    """Загружает модель и прогоняет пустой батч, чтобы первая задача не платила за инициализацию."""
+    get_backend().predict(np.zeros((batch_size, *IMAGE_SIZE, 3), dtype=np.float32))
+
+
+def list_dataset(dataset_dir=DATASET_DIR):
+    """
+    Размеченные изображения из папок dataset_dir/{back,face,front}: список (путь, класс).
+    """
+    samples = []
+    for label in sorted(class_indices):
+        label_dir = os.path.join(dataset_dir, label)
+        if not os.path.isdir(label_dir):
+            continue
+        for filename in sorted(os.listdir(label_dir)):
+            if filename.lower().endswith(IMAGE_EXTENSIONS):
+                samples.append((os.path.join(label_dir, filename), label))
+    return samples
 
-    img_array = img_array.reshape((1, 224, 224, 3))
 
-    prediction = model.predict(img_array)[0]
-    predicted_class = int(np.argmax(prediction))
-    predicted_label = class_names[predicted_class]
+def preprocess_images(image_files):
+    """
+    Декодирует изображения в один батч float32 (N, 224, 224, 3) со значениями 0..1.
+    Возвращает (батч, маска) — маска отмечает файлы, которые удалось открыть.
+    """
+    batch = np.zeros((len(image_files), *IMAGE_SIZE, 3), dtype=np.uint8)
+    valid = np.zeros(len(image_files), dtype=bool)
+    for i, image_file in enumerate(image_files):
+        try:
+            img = decode_image(image_file, IMAGE_SIZE, keep_aspect=False)
+        except Exception as e:
+            print(f"❌ Ошибка при открытии изображения {image_file}: {e}")
+            continue
+        batch[i] = np.asarray(img, dtype=np.uint8)
+        valid[i] = True
+
+    return np.multiply(batch, np.float32(1 / 255), dtype=np.float32), valid
+
+
+def classify_passport_photos(image_files, backend=None):
+    """
+    Классифицирует все изображения одним прямым проходом модели.
+    Для каждого файла возвращает (label, confidence) или None, если файл не открылся.
+    """
+    if not image_files:
+        return []
+
+    batch, valid = preprocess_images(image_files)
+    results = [None] * len(image_files)
+    if not valid.any():
+        return results
+
+    predictions = (backend or get_backend()).predict(batch[valid])
+    for index, prediction in zip(np.flatnonzero(valid), predictions):
+        predicted_class = int(np.argmax(prediction))
+        results[index] = (class_names[predicted_class], float(prediction[predicted_class]))
+    return results
+
+
+def predict_passport_photo(image_file, expected_type: str = None):
+    result = classify_passport_photos([image_file])[0]
+    if result is None:
+        return False
 
-    print(f"🔍 Prediction probabilities: {prediction}")
-    print(f"✅ Predicted class: {predicted_label}")
+    predicted_label, confidence = result
+    print(f"✅ Predicted class: {predicted_label} ({confidence:.3f})")
 
     if expected_type:
-        expected_class = class_indices.get(expected_type, -1)
-        print(f"🎯 Expected class: {expected_type} ({expected_class})")
-        return predicted_class == expected_class
+        print(f"🎯 Expected class: {expected_type}")
+        return predicted_label == expected_type
 
     return predicted_label
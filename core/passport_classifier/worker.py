@@ -0,0 +1,39 @@
+"""
+Прогрев ML-воркера (очередь ml).
+
+Процессы воркера, слушающего очередь ml, при старте ограничивают потоки
+TensorFlow так, чтобы все процессы вместе занимали ядра без переподписки,
+загружают модель и делают пробный прогон. Остальные воркеры модель не трогают.
+"""
+import os
+import time
+
+from celery.signals import celeryd_after_setup, worker_process_init
+from django.conf import settings
+
+ML_QUEUE = 'ml'
+
+# Заполняется в главном процессе воркера и наследуется дочерними при fork
+ml_worker = {'enabled': False, 'concurrency': 1}
+
+
+@celeryd_after_setup.connect
+def detect_ml_worker(sender, instance, **kwargs):
+    queues = instance.app.amqp.queues.consume_from or {}
+    ml_worker['enabled'] = ML_QUEUE in queues
+    ml_worker['concurrency'] = instance.concurrency or 1
+
+
+@worker_process_init.connect
+def warm_up_ml_worker(**kwargs):
+    if not ml_worker['enabled']:
+        return
+
+    from core.passport_classifier.utils import configure_threads, warm_up
+
+    threads = settings.PASSPORT_CLASSIFIER_THREADS or max(1, (os.cpu_count() or 1) // ml_worker['concurrency'])
+    configure_threads(threads)
+
+    started = time.perf_counter()
+    warm_up(batch_size=3)
+    print(f"🔥 Модель классификатора прогрета за {time.perf_counter() - started:.2f} s (потоков: {threads})")
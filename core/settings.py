@@ -138,11 +138,21 @@ AUTH_USER_MODEL = 'users.User'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'apps.users.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.AllowAny',
     ),
+    # JSON через orjson; без него — стандартные классы DRF
+    'DEFAULT_RENDERER_CLASSES': (
+        'apps.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'apps.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
 }
 
 # jwt
@@ -238,6 +248,34 @@ CELERY_BROKER_URL = 'redis://localhost:6379/0'
 CELERY_RESULT_BACKEND = 'redis://localhost:6379/0'
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
+CELERY_TASK_ROUTES = {
+    'core.passport_classifier.tasks.process_passport_verifications_task': {'queue': 'ml'},
+}
+
+# Backend классификатора паспортов: 'keras' (passport_model.keras)
+# или 'tflite' (квантованный passport_model.tflite, см. export_tflite.py)
+PASSPORT_CLASSIFIER_BACKEND = 'keras'
+# Потоков TensorFlow на процесс ML-воркера; None — ядра / concurrency
+PASSPORT_CLASSIFIER_THREADS = None
+
+# Проверка паспортов: окно накопления батча (сек) и максимум пользователей в батче
+PASSPORT_BATCH_WINDOW = 0.5
+PASSPORT_BATCH_MAX_USERS = 16
+# Батч, не разобранный за это время (воркер упал), возвращается в очередь (сек)
+PASSPORT_BATCH_STALE_TIMEOUT = 600
+# После стольких неудачных попыток проверка откладывается в passport_verification:dead
+PASSPORT_VERIFICATION_MAX_ATTEMPTS = 3
+
+# Кэш пользователя для JWT-аутентификации: Redis (сек), память процесса (сек) и её размер
+AUTH_USER_CACHE_TIMEOUT = 300
+AUTH_USER_CACHE_L1_TIMEOUT = 60
+AUTH_USER_CACHE_L1_SIZE = 10000
+
+# Как часто процесс сверяет версию справочника регионов в Redis (сек)
+REGIONS_CACHE_CHECK_INTERVAL = 2
+
+# Время жизни закэшированных страниц ленты исполнителя (сек); сбрасываются и раньше — при изменении заказов
+EXECUTOR_FEED_CACHE_TIMEOUT = 60
 
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = 'smtp.gmail.com'